@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Benchmark the stages of scripts/convert_sources.py on a synthetic corpus.
+
+Usage:
+    python3 scripts/bench_convert_sources.py [--scale 1.0] [--repeat 3]
+        [--baseline PATH] [--update-baseline] [--check] [--tolerance 0.25]
+        [--only NAME ...] [--keep-corpus DIR] [--json PATH]
+
+Generates realistic inputs with a fixed seed (Title-delimited DOCX with
+timestamped transcripts, multi-hour VTT recordings with speakers, a
+KAPITEL-structured pdftotext-style book, Format A and Format B product
+matrices), times each stage (best of --repeat runs) and records peak Python
+memory (tracemalloc, separate run; allocations inside C libraries such as lxml
+are not counted). Results are compared against the baseline file; any
+benchmark slower or more memory-hungry than baseline * (1 + tolerance), beyond
+a small absolute noise floor, fails the run with exit code 1. Baselines are
+machine-specific: record them with --update-baseline on the machine that runs
+the comparison (none is committed). Without a usable baseline the comparison
+is skipped; with --check (for CI) a missing baseline, a scale mismatch or a
+benchmark absent from the baseline fails the run too.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import convert_sources as cs  # noqa: E402
+
+DEFAULT_BASELINE = cs.BASE_DIR / "tests" / "baselines" / "convert-sources-bench.json"
+
+# Differences below these floors are treated as noise, whatever the tolerance.
+MIN_SECONDS_DELTA = 0.005
+MIN_PEAK_MB_DELTA = 0.5
+
+WORDS = (
+    "Haare Kopfhaut Pflege Shampoo Conditioner Maske Protein Feuchtigkeit Spliss "
+    "Locken Wellen Öl Silikone Längen Spitzen trocken fettig fein dick normal "
+    "und oder aber wenn dann weil also eigentlich wirklich sehr immer nie oft "
+    "ich du wir ihr man das die der ein eine nicht auch noch schon nur mehr "
+    "benutzen waschen föhnen kämmen einmassieren ausspülen einwirken lassen "
+    "Inhaltsstoffe Tenside Glycerin Keratin Bond Repair Hitze Schutz Spray"
+).split()
+GREETINGS = ["Hallo", "Hey ", "Hi ", "Liebe", "Moin", "Huhu", "Servus"]
+SPEAKERS = ["Anna Beraterin", "Teilnehmerin 1", "Teilnehmer 2", "Moderation"]
+
+
+def sentence(rng: random.Random, lo: int = 6, hi: int = 18) -> str:
+    words = rng.choices(WORDS, k=rng.randint(lo, hi))
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"])
+
+
+def mmss(secs: int) -> str:
+    return f"{secs // 60}:{secs % 60:02d}"
+
+
+# ---------------------------------------------------------------------------
+# SYNTHETIC CORPUS
+# ---------------------------------------------------------------------------
+
+def make_docx(path: Path, rng: random.Random, paras_per_section: int):
+    """DOCX with the Title sections parse_docx dispatches on."""
+    from docx import Document
+
+    doc = Document()
+
+    def para(text: str, style: str | None = None):
+        doc.add_paragraph(text, style=style) if style else doc.add_paragraph(text)
+
+    for title in ("Haarpflege Basics Kurs", "Haarfplege Advanced Kurs", "Haarstyling Basic"):
+        para(title, "Title")
+        modules = max(1, paras_per_section // 200)
+        for mod in range(1, modules + 1):
+            para(f"{mod:02d} {' '.join(rng.choices(WORDS, k=2))}")
+            secs = 0
+            for i in range(paras_per_section // modules):
+                secs += rng.randint(3, 20)
+                para(f"{mmss(secs)} {sentence(rng)}")
+                if i % 7 == 6:
+                    para("")
+
+    para("Haarpflege Basic 2", "Title")
+    for topic in range(max(1, paras_per_section // 100)):
+        para(f"Thema {topic + 1} {rng.choice(WORDS)}", "Heading 2")
+        for i in range(100):
+            para(f"{mmss(i * 9)} {sentence(rng)}", "Heading 1")
+
+    para("Häufige Fragen", "Title")
+    for _ in range(paras_per_section // 4):
+        para(rng.choice(GREETINGS) + " " + sentence(rng, 10, 30))
+        para(sentence(rng, 10, 40))
+        para("")
+
+    para("Linksammlung Live-Call 10.06.25", "Title")
+    for i in range(paras_per_section // 10):
+        if i % 50 == 49:
+            para(f"Linksammlung Live-Call {(i // 50) % 28 + 1:02d}.07.25")
+        para(f"https://example.com/produkt/{i}" if i % 2 else sentence(rng, 3, 6))
+
+    para("Produklisten", "Title")
+    for _ in range(50):
+        para(" ".join(rng.choices(WORDS, k=3)))
+
+    para("Story", "Title")
+    for i in range(paras_per_section // 2):
+        para(f"{mmss(i * 11)} {sentence(rng)}")
+
+    para("Call Recordings", "Title")
+    doc.save(str(path))
+
+
+def make_vtt(path: Path, rng: random.Random, hours: float):
+    """Zoom-style VTT with numbered cues and 'Speaker: text' lines."""
+    lines = ["WEBVTT", ""]
+    ms = 0
+    cue = 1
+    speaker = SPEAKERS[0]
+    end_ms = int(hours * 3600 * 1000)
+    while ms < end_ms:
+        dur = rng.randint(1500, 6000)
+        if rng.random() < 0.08:
+            speaker = rng.choice(SPEAKERS)
+        lines.append(str(cue))
+        lines.append(f"{vtt_ts(ms)} --> {vtt_ts(ms + dur)}")
+        lines.append(f"{speaker}: {sentence(rng, 3, 14)}")
+        lines.append("")
+        ms += dur + rng.randint(0, 800)
+        cue += 1
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def vtt_ts(ms: int) -> str:
+    secs, ms = divmod(ms, 1000)
+    return f"{secs // 3600:02d}:{secs % 3600 // 60:02d}:{secs % 60:02d}.{ms:03d}"
+
+
+def make_book_text(rng: random.Random, chapters: int, paras_per_chapter: int) -> str:
+    """pdftotext -layout style output: form feeds, page numbers, hyphenated breaks."""
+    out = ["Vorwort", ""]
+    page = 1
+    for chapter in range(1, chapters + 1):
+        out.append(f"\x0cKAPITEL {chapter}")
+        out.append("")
+        out.append(" ".join(rng.choices(WORDS, k=3)).upper())
+        out.append("")
+        for p in range(paras_per_chapter):
+            words = " ".join(sentence(rng) for _ in range(rng.randint(2, 6))).split()
+            line = []
+            for word in words:
+                line.append(word)
+                if sum(len(w) + 1 for w in line) > 60:
+                    if rng.random() < 0.15 and len(word) > 6:
+                        line[-1] = word[: len(word) // 2] + "-"
+                        out.append("    " + "  ".join(line))
+                        line = [word[len(word) // 2:]]
+                    else:
+                        out.append("    " + "  ".join(line))
+                        line = []
+            if line:
+                out.append("    " + " ".join(line))
+            out.append("")
+            if p % 6 == 5:
+                page += 1
+                out.append(f"{page:>40}")
+                out.append("\x0c")
+    out.append("ÜBER DEN AUTOR")
+    out.append(sentence(rng, 20, 40))
+    return "\n".join(out)
+
+
+def make_matrix(path: Path, rng: random.Random, fmt: str, rows_per_texture: int, columns: int):
+    """Product matrix in Format A (headers in row 1) or B (title in A1, headers in row 2)."""
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    header_row = 1 if fmt == "A" else 2
+    if fmt == "B":
+        ws.cell(row=1, column=1, value="Shampoo")
+    concerns = list(cs.CONCERN_SLUG_OVERRIDES)
+    for col in range(columns):
+        header = concerns[col] if col < len(concerns) else f"Bedarf {col}"
+        ws.cell(row=header_row, column=col + 2, value=header)
+    row = header_row + 1
+    for texture in cs.HAIR_TEXTURE_MAP:
+        for r in range(rows_per_texture):
+            if r == 0:
+                ws.cell(row=row, column=1, value=texture)
+            for col in range(columns):
+                roll = rng.random()
+                if roll < 0.1:
+                    value = "-"
+                elif roll < 0.4:
+                    value = ", ".join(product_name(rng) for _ in range(3))
+                elif roll < 0.6:
+                    value = "\n".join(product_name(rng) for _ in range(2))
+                else:
+                    value = product_name(rng) + rng.choice(["", "", " (Silikon)", " (Kokos)", "\n(Silikone /Kokos)"])
+                ws.cell(row=row, column=col + 2, value=value)
+            row += 1
+    wb.save(str(path))
+
+
+def product_name(rng: random.Random) -> str:
+    return f"{rng.choice(['OGX', 'Balea', 'Jean&Len', 'Garnier', 'Olaplex'])} {' '.join(rng.choices(WORDS, k=2))}"
+
+
+def build_corpus(root: Path, scale: float) -> dict:
+    """Write the synthetic corpus under root and return its paths/objects."""
+    rng = random.Random(1234)
+    root.mkdir(parents=True, exist_ok=True)
+    corpus = {
+        "docx": root / "complete_data.docx",
+        "vtt": root / "GMT20250610-180000_Recording.transcript.vtt",
+        "xlsx_a": root / "Produktliste Leave-In.xlsx",
+        "xlsx_b": root / "Produktliste Shampoo.xlsx",
+    }
+    make_docx(corpus["docx"], rng, paras_per_section=max(50, int(2000 * scale)))
+    make_vtt(corpus["vtt"], rng, hours=4.0 * scale)
+    book = make_book_text(rng, chapters=16, paras_per_chapter=max(5, int(120 * scale)))
+    (root / "book.txt").write_text(book, encoding="utf-8")
+    corpus["book_lines"] = book.split("\n")
+    make_matrix(corpus["xlsx_a"], rng, "A", rows_per_texture=max(2, int(20 * scale)), columns=12)
+    make_matrix(corpus["xlsx_b"], rng, "B", rows_per_texture=max(2, int(20 * scale)), columns=12)
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# BENCHMARKS
+# ---------------------------------------------------------------------------
+
+def benchmarks(corpus: dict) -> dict:
+    """Name -> zero-argument callable exercising one stage."""
+    vtt_text = corpus["vtt"].read_text(encoding="utf-8")
+    cues = cs.parse_vtt_cues(vtt_text)
+    return {
+        "parse_docx": lambda: cs.parse_docx(),
+        "clean_pdf_text": lambda: cs.clean_pdf_text(corpus["book_lines"]),
+        "parse_vtt_cues": lambda: cs.parse_vtt_cues(vtt_text),
+        "merge_vtt_cues": lambda: cs.merge_vtt_cues(cues, window_seconds=90),
+        "convert_single_excel_matrix[A]": lambda: cs.convert_single_excel_matrix(corpus["xlsx_a"]),
+        "convert_single_excel_matrix[B]": lambda: cs.convert_single_excel_matrix(corpus["xlsx_b"]),
+    }
+
+
+def measure(fn, repeat: int) -> dict:
+    """Best-of-N wall time, then one tracemalloc run for peak memory."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": round(min(times), 6), "peak_mb": round(peak / 2**20, 3)}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return regression messages for results exceeding baseline * (1 + tolerance).
+
+    Deltas below MIN_SECONDS_DELTA / MIN_PEAK_MB_DELTA never count as regressions.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, floor in (("seconds", MIN_SECONDS_DELTA), ("peak_mb", MIN_PEAK_MB_DELTA)):
+            limit = max(base[metric] * (1 + tolerance), base[metric] + floor)
+            if result[metric] > limit:
+                regressions.append(
+                    f"{name}: {metric} {result[metric]} > {limit:.6g} (baseline {base[metric]})"
+                )
+    return regressions
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Benchmark convert_sources.py stages.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Corpus size multiplier (default: 1.0)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is kept)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--check", action="store_true",
+                        help="Fail (exit 1) when there is no baseline to compare against, instead of skipping")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default: 0.25)")
+    parser.add_argument("--only", action="append", metavar="NAME", help="Run only benchmarks whose name starts with NAME")
+    parser.add_argument("--keep-corpus", type=Path, help="Write the corpus and outputs here instead of a temp dir")
+    parser.add_argument("--json", type=Path, help="Also write results to this JSON file")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.check and not args.update_baseline and not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; record one with --update-baseline on this machine.")
+        return 1
+    with tempfile.TemporaryDirectory(prefix="convert-sources-bench-") as tmp:
+        root = args.keep_corpus.resolve() if args.keep_corpus else Path(tmp)
+        print(f"Generating synthetic corpus (scale {args.scale}) in {root} ...")
+        corpus = build_corpus(root / "corpus", args.scale)
+        cs.apply_config({
+            "DOCX_PATH": corpus["docx"],
+            "MD_DIR": root / "markdown",
+            "PRODUCTS_JSON_DIR": root / "products-from-excel",
+            "EXTRACT_CACHE_DIR": None,  # measure extraction, not cache hits
+            "REUSE_SECTIONS": False,  # likewise for the DOCX section memo on repeats 2..N
+        })
+
+        results = {}
+        for name, fn in benchmarks(corpus).items():
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            results[name] = measure(fn, max(1, args.repeat))
+            print(f"  {name:<34} {results[name]['seconds']:>10.4f} s {results[name]['peak_mb']:>10.2f} MB")
+
+    report = {"scale": args.scale, "benchmarks": results}
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one.")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline.get("scale") != args.scale:
+        print(f"Baseline was recorded at scale {baseline.get('scale')}, not {args.scale}; "
+              f"{'failing' if args.check else 'skipping comparison'}.")
+        return 1 if args.check else 0
+    regressions = compare(results, baseline["benchmarks"], args.tolerance)
+    if args.check:
+        regressions += [f"{name}: not in baseline" for name in results if name not in baseline["benchmarks"]]
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,67 @@ Convert all raw sources (DOCX, PDF, VTT) into structured Markdown files
 for knowledge-base ingestion.
 
 Usage:
-    python3 scripts/convert_sources.py
+    python3 scripts/convert_sources.py [--jobs N] [--only docx|pdf|vtt|excel ...]
+        [--docx PATH] [--pdf PATH] [--corpus DIR ...] [--vtt-dir DIR] [--xlsx-dir DIR]
+        [--out-dir DIR] [--json-dir DIR] [--force]
+        [--report PATH] [--profile-dir DIR] [--trace-memory] [--dup-threshold J]
+        [--fts [PATH]] [--search QUERY]
+        [--cache-dir DIR] [--no-cache] [--docx-reader stream|python-docx]
+        [--pdf-extract whole|pages] [--pdf-timeout SECONDS]
+        [--segment-tokens [MIN:]TARGET[:MAX]] [--reduce-transcripts]
+        [--watch [SECONDS]] [--events PATH|-]
+        [--format files|ndjson] [--out PATH|-]
+
+Sources whose content hash matches data/markdown/.manifest.json are skipped;
+outputs of deleted sources are removed. Use --force for a full run.
+data/markdown/index.jsonl lists every generated document (path relative to
+data/markdown, front matter, body chars, bytes, sha256), one JSON per line;
+data/markdown/chunk-plan.jsonl holds the chunk spans and token estimates that
+scripts/ingest-markdown.ts would produce for each of them (over the copy in
+data/markdown-cleaned/ where there is one); segments.jsonl
+fingerprints every paragraph/segment and .segment-diff.json lists the segments
+added, removed or changed since the previous run; near-duplicates.json clusters
+near-duplicate segments across documents (MinHash/LSH, --dup-threshold).
+With --fts [PATH] a SQLite FTS5 index (default data/markdown/search.sqlite) of
+all documents and segments is built for offline BM25 lookups; --search QUERY
+queries it. The manifest tracks the index: it is rebuilt only when documents
+change, and a run without --fts removes it once it would be stale.
+Outputs are staged next to data/markdown/ (and data/products-from-excel/) and
+swapped in only when the run succeeds; files whose bytes did not change keep
+their inode and mtime.
+With --format ndjson nothing is written: every document (and product list) is
+streamed as one JSON record per line to --out (default stdout, log on stderr)
+as soon as it is converted, so a consumer can chunk and embed while the
+remaining sources are still converting.
+Per-stage/per-source metrics (wall/CPU time, memory, bytes, counts) are written
+to data/markdown/.run-report.json.
+
+Extracted DOCX paragraphs and pdftotext output are cached in data/.extract-cache
+(keyed by source hash and extractor), so converter changes never re-parse.
+
+The DOCX is read by streaming word/document.xml (python-docx only with
+--docx-reader python-docx); each Title section is converted as soon as it has
+been read.
+
+With --corpus DIR every DOCX/PDF under DIR is converted (in parallel with
+--jobs) into its own namespace, data/markdown/corpus/<document>/.
+With --pdf-extract pages the book is split by page ranges found in one streaming
+pass, and chapters are extracted concurrently (same Markdown, lower latency).
+Unchanged DOCX sections reuse their previous outputs via
+data/markdown/.sections-<docx>.json.
+With --segment-tokens, course transcripts, stories and live calls are cut into
+segments of a token budget (preferring speaker/paragraph, then timestamp
+boundaries) and marked `segmentation: "tokens"`, so ingestion embeds each
+segment as one chunk. --reduce-transcripts drops German fillers ("ähm",
+"also"), repeated words and backchannel cues from their speech first (keeping
+[MM:SS] markers) and reports the tokens saved per file.
+With --watch the sources are polled after the run; once a new or changed VTT,
+workbook, DOCX or PDF has finished writing, only its stage is rerun (unchanged
+units and DOCX sections are reused) and, with --events, a JSON change event
+listing the rewritten and removed outputs is appended.
+
+Importing this module has no side effects: python-docx/openpyxl are imported
+and source files are located only when a stage actually needs them.
 
 Reads from:
     the source DOCX file in the project root or data folder
@@ -15,17 +75,106 @@ Writes to:
     data/markdown/
 """
 
+import argparse
+import bisect
+import contextlib
+import cProfile
+import difflib
+import hashlib
+import importlib.metadata
+import io
+import itertools
 import json
 import os
+import pstats
+import random
 import re
+import resource
+import shutil
+import sqlite3
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zipfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from pathlib import Path
-from docx import Document
-import openpyxl
+from typing import Iterable, Iterator, NamedTuple
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
 MD_DIR = DATA_DIR / "markdown"
+PRODUCTS_JSON_DIR = DATA_DIR / "products-from-excel"
+VTT_DIR = DATA_DIR
+XLSX_DIR = DATA_DIR / "product_lists" / "0326v2"
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 2
+REPORT_NAME = ".run-report.json"
+INDEX_NAME = "index.jsonl"
+CHUNK_PLAN_NAME = "chunk-plan.jsonl"
+# scripts/clean-transcripts.ts copies transcripts to <MD_DIR>-cleaned/, which is
+# what scripts/ingest-markdown.ts reads.
+CLEANED_SUFFIX = "-cleaned"
+SEGMENTS_NAME = "segments.jsonl"
+# Bumped when segmentation changes, so segments.jsonl records are recomputed.
+SEGMENTS_VERSION = 2
+SEGMENT_DIFF_NAME = ".segment-diff.json"
+NEAR_DUPLICATES_NAME = "near-duplicates.json"
+FTS_INDEX_NAME = "search.sqlite"
+
+# Instrumentation options (--profile-dir / --trace-memory).
+PROFILE_DIR: Path | None = None
+TRACE_MEMORY = False
+
+# Live output root -> staging directory while a staged run is in progress.
+STAGING_ROOTS: dict[Path, Path] = {}
+WRITER_THREADS = 8
+
+# DOCX paragraph reader: "stream" (incremental word/document.xml parse) or
+# "python-docx" (full object model; kept for cross-checking).
+DOCX_READER = "stream"
+
+# Extracted DOCX paragraphs / pdftotext output, keyed by source hash and
+# extractor (--cache-dir; None = always re-extract).
+EXTRACT_CACHE_DIR: Path | None = DATA_DIR / ".extract-cache"
+
+# Book extraction: "whole" (one pdftotext call, cached) or "pages" (concurrent
+# page-range calls per chapter); seconds allowed per pdftotext call.
+PDF_EXTRACT = "whole"
+PDF_TIMEOUT = 300
+
+# Reuse outputs of unchanged DOCX sections (off with --force).
+REUSE_SECTIONS = True
+
+# Transcript segmentation (--segment-tokens): None = blank lines / 90-second
+# windows; (min, target, max) tokens = one segment per embedding call.
+SEGMENT_TOKENS: tuple[int, int, int] | None = None
+SEGMENTED_SOURCE_TYPES = ("transcript", "narrative", "live_call_transcript")
+
+# Drop fillers, repetitions and backchannel cues from transcripts (--reduce-transcripts).
+REDUCE_TRANSCRIPTS = False
+
+# NDJSON streaming (--format ndjson): converters emit records instead of files.
+# STREAM_RECORDS reaches pool workers; RECORD_STREAM is this process's sink.
+STREAM_RECORDS = False
+RECORD_STREAM: io.TextIOBase | None = None
+
+# Explicit source paths (--docx / --pdf). None = discover on first use.
+DOCX_PATH: Path | None = None
+PDF_PATH: Path | None = None
+
+# Corpus mode (--corpus DIR): every DOCX/PDF under these roots is a document
+# converted into its own namespace, MD_DIR/corpus/<namespace>/. Empty = the
+# single DOCX_PATH/PDF_PATH.
+CORPUS_ROOTS: list[Path] = []
+CORPUS_DIR_NAME = "corpus"
+# Namespace of the document being converted (set per unit by convert_document).
+DOCUMENT_NAMESPACE: str | None = None
 
 
 def find_source_file(patterns: list[str], roots: list[Path]) -> Path:
@@ -40,26 +189,223 @@ def find_source_file(patterns: list[str], roots: list[Path]) -> Path:
     raise FileNotFoundError(f"No source file found for patterns [{joined_patterns}] in [{joined_roots}]")
 
 
-DOCX_PATH = find_source_file(["*data*complete*.docx", "*.docx"], [BASE_DIR, DATA_DIR])
-PDF_PATH = find_source_file(["*Buchsatz*.pdf", "*book*.pdf", "*.pdf"], [DATA_DIR])
+def docx_path() -> Path:
+    """The source DOCX: --docx if given, else the first match in the project/data folders."""
+    global DOCX_PATH
+    if DOCX_PATH is None:
+        DOCX_PATH = find_source_file(["*data*complete*.docx", "*.docx"], [BASE_DIR, DATA_DIR])
+    return DOCX_PATH
+
+
+def pdf_path() -> Path:
+    """The book PDF: --pdf if given, else the first match in the data folder."""
+    global PDF_PATH
+    if PDF_PATH is None:
+        PDF_PATH = find_source_file(["*Buchsatz*.pdf", "*book*.pdf", "*.pdf"], [DATA_DIR])
+    return PDF_PATH
+
+
+def corpus_documents(suffix: str) -> list[tuple[Path, str]]:
+    """(path, namespace) of every corpus document with this suffix, in path order.
+
+    The namespace is the slugified path below its corpus root, without suffix.
+    """
+    documents: dict[str, Path] = {}
+    for root in CORPUS_ROOTS:
+        for path in sorted(root.rglob(f"*{suffix}")):
+            if path.name.startswith("~$") or not path.is_file():
+                continue  # Office lock files
+            namespace = slugify(path.relative_to(root).with_suffix("").as_posix().replace("/", " "))
+            if namespace in documents:
+                raise ValueError(f"Corpus documents {documents[namespace]} and {path} share namespace '{namespace}'")
+            documents[namespace] = path
+    return sorted(((path, namespace) for namespace, path in documents.items()), key=lambda item: str(item[0]))
+
+
+def document_dir() -> Path:
+    """Markdown root of the document being converted (its namespace in corpus mode)."""
+    if DOCUMENT_NAMESPACE is None:
+        return MD_DIR
+    return MD_DIR / CORPUS_DIR_NAME / DOCUMENT_NAMESPACE
+
+
+def convert_document(namespace: str, convert, *args):
+    """Run a document converter with its outputs under the corpus namespace."""
+    global DOCUMENT_NAMESPACE
+    previous = DOCUMENT_NAMESPACE
+    DOCUMENT_NAMESPACE = namespace
+    try:
+        convert(*args)
+    finally:
+        DOCUMENT_NAMESPACE = previous
+
+
+# Module globals that the CLI may override; snapshotted for pool workers.
+CONFIG_GLOBALS = (
+    "MD_DIR", "PRODUCTS_JSON_DIR", "VTT_DIR", "XLSX_DIR", "DOCX_PATH", "PDF_PATH",
+    "PROFILE_DIR", "TRACE_MEMORY", "STAGING_ROOTS", "STREAM_RECORDS", "EXTRACT_CACHE_DIR",
+    "DOCX_READER", "REUSE_SECTIONS", "CORPUS_ROOTS",
+    "PDF_EXTRACT", "PDF_TIMEOUT", "SEGMENT_TOKENS", "REDUCE_TRANSCRIPTS",
+)
+
+
+def current_config() -> dict:
+    """Snapshot of the overridable path globals."""
+    return {name: globals()[name] for name in CONFIG_GLOBALS}
+
+
+def apply_config(config: dict):
+    """Set overridable path globals (also used as the pool worker initializer)."""
+    for name, value in config.items():
+        if name not in CONFIG_GLOBALS:
+            raise KeyError(f"Unknown config key: {name}")
+        globals()[name] = value
+
+
+# ---------------------------------------------------------------------------
+# TEXT NORMALIZATION (shared by slugs, cleaners and the search index)
+# ---------------------------------------------------------------------------
+
+UMLAUT_FOLDING = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+SLUG_DROP = re.compile(r'[^\w\s-]+')
+SLUG_SEPARATORS = re.compile(r'[\s_-]+')
+SPACE_RUN = re.compile(r' {2,}')
+
+_slug_cache: dict[str, str] = {}
+
+
+def fold_text(text: str) -> str:
+    """Lowercase and spell out umlauts/ß (ä -> ae, ö -> oe, ü -> ue, ß -> ss)."""
+    return text.lower().translate(UMLAUT_FOLDING)
 
 
 def slugify(text: str) -> str:
-    """Create a filename-safe slug from text."""
-    text = text.lower().strip()
-    text = re.sub(r'[äÄ]', 'ae', text)
-    text = re.sub(r'[öÖ]', 'oe', text)
-    text = re.sub(r'[üÜ]', 'ue', text)
-    text = re.sub(r'[ß]', 'ss', text)
-    text = re.sub(r'[^\w\s-]', '', text)
-    text = re.sub(r'[\s_]+', '-', text)
-    text = re.sub(r'-+', '-', text)
-    return text.strip('-')[:80]
+    """Create a filename-safe slug from text (memoized: titles and categories repeat)."""
+    slug = _slug_cache.get(text)
+    if slug is None:
+        slug = SLUG_SEPARATORS.sub('-', SLUG_DROP.sub('', fold_text(text))).strip('-')[:80]
+        _slug_cache[text] = slug
+    return slug
+
+
+def squash_spaces(text: str) -> str:
+    """Collapse runs of spaces and strip the ends."""
+    return SPACE_RUN.sub(' ', text).strip()
+
+
+# ---------------------------------------------------------------------------
+# TRANSCRIPT REDUCTION (--reduce-transcripts)
+# ---------------------------------------------------------------------------
+#
+# Verbatim speech is full of hesitations ("ähm"), discourse fillers ("also",
+# "halt"), stutters ("ich ich") and backchannel cues ("Ja." from a listener in
+# the middle of someone else's turn). Only the speech is rewritten: [MM:SS]
+# markers and speaker labels are added around it afterwards, or skipped over.
+
+# Hesitation sounds: always removed.
+HESITATIONS = r"ä+h+m*|ö+h+m*|e+h*m+|h+m+|m+h+m+"
+# Discourse fillers: removed as a comma-delimited aside.
+DISCOURSE_FILLERS = r"also|halt|quasi|sozusagen|irgendwie|eigentlich|genau|okay|ok|ne|gell|naja|na ja"
+# Sentence openers removed when followed by a comma ("Also, ...", "Genau, ...").
+OPENING_FILLERS = r"also|genau|okay|ok|ja|naja|na ja"
+# A cue of at most BACKCHANNEL_MAX_WORDS of these is a listener's backchannel.
+BACKCHANNEL_WORDS = frozenset({"ja", "genau", "okay", "ok", "richtig", "stimmt", "klar", "super", "cool", "mhm", "hm"})
+BACKCHANNEL_MAX_WORDS = 2
+# A cue of at most MICRO_CUE_WORDS that starts within MICRO_CUE_GAP_MS of the
+# previous cue of the same speaker is appended to that cue.
+MICRO_CUE_WORDS = 2
+MICRO_CUE_GAP_MS = 2000
+# Marks where a removal left a sentence start, so the next word is capitalised.
+SENTENCE_START = "\x00"
+
+# Words are bounded by hyphens too, so "Hmmm-Effekt" is left alone.
+FILLER_RUN = re.compile(
+    rf"(?<![\w-])(?:{HESITATIONS})(?![\w-])(?:[\s,]+(?:{HESITATIONS})(?![\w-]))*(?:\s*(?:,|\.\.\.|…))?\s*",
+    re.IGNORECASE,
+)
+OPENING_FILLER = re.compile(rf"(?<![\w-])(?:{OPENING_FILLERS}),\s*", re.IGNORECASE)
+ASIDE_FILLER = re.compile(rf",\s*(?:{DISCOURSE_FILLERS})\s*(?:(,\s*)|(?=[.!?]))", re.IGNORECASE)
+# Only alphabetic words collapse ("1 1 2 3" stays); a single word only when it
+# comes three times or more ("ich ich ich"), so "sehr sehr" and "die die Haare"
+# stay, while restarts of two or three words collapse ("in der in der").
+REPEATED_WORD = re.compile(r"(?<![\w-])([^\W\d_]+)(?:,?\s+\1(?![\w-])){2,}", re.IGNORECASE)
+REPEATED_PHRASE = re.compile(r"(?<![\w-])([^\W\d_]+(?:\s+[^\W\d_]+){1,2})(?:,?\s+\1(?![\w-]))+", re.IGNORECASE)
+CAPITALIZE_AFTER = re.compile(rf"{SENTENCE_START}[\s{SENTENCE_START}]*(\w)")
+SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+(?=[,.!?;:])")
+STRAY_COMMAS = re.compile(r",+(?=\s*[,.!?])|^[\s,.;:…]+")
+WORD = re.compile(r"\w+")
+INLINE_ANCHOR = re.compile(r'(\[\d{1,2}:\d{2}(?::\d{2})?\])')
+
+
+def _filler_replacement(match: re.Match, mid_sentence: str) -> str:
+    """What replaces a removed filler: SENTENCE_START where it began a sentence."""
+    text, pos = match.string, match.start()
+    while pos and text[pos - 1].isspace():
+        pos -= 1
+    if pos and text[pos - 1] in ".!?" + SENTENCE_START:
+        return SENTENCE_START
+    if pos == 0:
+        # A cue or paragraph may start mid-sentence: capitalise only if the filler was.
+        return SENTENCE_START if match.group(0)[:1].isupper() else ""
+    return mid_sentence
+
+
+def reduce_speech(text: str) -> str:
+    """Remove fillers and immediate repetitions from a piece of speech."""
+    text = FILLER_RUN.sub(lambda m: _filler_replacement(m, " "), text)
+    text = OPENING_FILLER.sub(lambda m: _filler_replacement(m, m.group(0)), text)
+    text = ASIDE_FILLER.sub(lambda m: " " if m.group(1) else "", text)
+    text = REPEATED_WORD.sub(r"\1", text)
+    text = REPEATED_PHRASE.sub(r"\1", text)
+    text = CAPITALIZE_AFTER.sub(lambda m: m.group(1).upper(), text).replace(SENTENCE_START, "")
+    text = SPACE_BEFORE_PUNCTUATION.sub("", text)
+    return squash_spaces(STRAY_COMMAS.sub("", text))
+
+
+def reduce_transcript_text(text: str) -> str:
+    """reduce_speech for text that may contain inline [MM:SS] markers (kept as they are)."""
+    if "[" not in text:
+        return reduce_speech(text)
+    parts = INLINE_ANCHOR.split(text)
+    for i in range(0, len(parts), 2):
+        part = parts[i]
+        reduced = reduce_speech(part)
+        lead = " " if i > 0 and part[:1].isspace() else ""
+        trail = " " if i < len(parts) - 1 and part[-1:].isspace() else ""
+        parts[i] = f"{lead}{reduced}{trail}" if reduced else (lead or trail)
+    return squash_spaces("".join(parts))
+
+
+def reduce_tracked(text: str, reduction: dict | None) -> str:
+    """reduce_transcript_text, adding chars before/after to reduction (no-op if None)."""
+    if reduction is None:
+        return text
+    reduced = reduce_transcript_text(text)
+    reduction["chars_in"] += len(text)
+    reduction["chars_out"] += len(reduced)
+    return reduced
+
+
+def new_reduction() -> dict | None:
+    """Reduction tally for one document, or None when --reduce-transcripts is off."""
+    return {"chars_in": 0, "chars_out": 0} if REDUCE_TRANSCRIPTS else None
+
+
+def report_reduction(reduction: dict | None):
+    """Print and count the tokens one document saved by reduction."""
+    if reduction is None:
+        return
+    saved = estimate_tokens(reduction["chars_in"]) - estimate_tokens(reduction["chars_out"])
+    share = saved / max(estimate_tokens(reduction["chars_in"]), 1)
+    count("tokens_saved", saved)
+    print(f"    (reduced: ~{saved:,} tokens saved, {share:.0%})")
 
 
 def write_md(path: Path, front_matter: dict, content: str):
     """Write a Markdown file with YAML front matter."""
-    path.parent.mkdir(parents=True, exist_ok=True)
+    if SEGMENT_TOKENS and front_matter.get("source_type") in SEGMENTED_SOURCE_TYPES:
+        # Tells ingestion (and the chunk plan) that each segment is one chunk.
+        front_matter = {**front_matter, "segmentation": "tokens"}
     lines = ["---"]
     for key, val in front_matter.items():
         if isinstance(val, list):
@@ -72,87 +418,1615 @@ def write_md(path: Path, front_matter: dict, content: str):
     lines.append("")
     lines.append(content.strip())
     lines.append("")
-    path.write_text("\n".join(lines), encoding="utf-8")
-    print(f"  -> {path.relative_to(BASE_DIR)}")
+    data = "\n".join(lines).encode("utf-8")
+    count("documents")
+    if STREAM_RECORDS:
+        parsed_front_matter, body = parse_front_matter(data.decode("utf-8"))
+        emit_record({
+            "kind": "document",
+            "path": Path(path).resolve().relative_to(MD_DIR.resolve()).as_posix(),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "front_matter": parsed_front_matter,
+            "body": body,
+        })
+    else:
+        write_output(path, data)
+        record_output(path)
+    print(f"  -> {rel_key(path)}")
 
 
 # ---------------------------------------------------------------------------
-# 1. DOCX CONVERSION
+# OUTPUT WRITER (staged, skip-identical, atomic publish)
 # ---------------------------------------------------------------------------
+#
+# Outside a staged run, write_output() writes in place but never rewrites
+# identical bytes. During a staged run (begin_staging ... publish_staging) every
+# output goes to a sibling staging directory; identical files are hard-linked
+# from the live tree so their inode and mtime survive, and publish_staging()
+# carries over untouched files and swaps the directories. An interrupted run
+# leaves the live tree as it was.
+
+_write_pool: ThreadPoolExecutor | None = None
+_write_pool_pid: int | None = None
+_pending_writes: dict[Path, object] = {}
+# Live output paths dropped by the current staged run (not carried over).
+_staged_removals: set[Path] = set()
+
+
+def output_roots() -> list[Path]:
+    """Output root directories, without roots nested inside another root."""
+    roots = sorted({MD_DIR.resolve(), PRODUCTS_JSON_DIR.resolve()}, key=lambda p: len(p.parts))
+    outer: list[Path] = []
+    for root in roots:
+        if not any(root.is_relative_to(other) for other in outer):
+            outer.append(root)
+    return outer
+
+
+def staged_path(path: Path) -> Path:
+    """Where an output is physically written: its staging location during a staged run."""
+    for root, stage in STAGING_ROOTS.items():
+        if path.is_relative_to(root):
+            return stage / path.relative_to(root)
+    return path
+
+
+def read_output(path: Path) -> str:
+    """Text of an output as of this run: staged if rewritten, else the untouched live file."""
+    target = staged_path(path)
+    return (target if target.exists() else path).read_text(encoding="utf-8")
+
+
+def link_or_copy(src: Path, dst: Path):
+    """Hard-link src to dst (same inode and mtime), falling back to a metadata-preserving copy."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _write_file(path: Path, data: bytes):
+    target = staged_path(path)
+    try:
+        unchanged = path.stat().st_size == len(data) and path.read_bytes() == data
+    except OSError:
+        unchanged = False
+    if unchanged:
+        if target != path:
+            target.unlink(missing_ok=True)
+            link_or_copy(path, target)
+        return
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, target)
+
+
+def write_output(path: Path, data: bytes):
+    """Queue an output write on the I/O thread pool (see flush_writes)."""
+    global _write_pool, _write_pool_pid
+    if _write_pool is None or _write_pool_pid != os.getpid():
+        # Pools do not survive fork: pool workers get their own.
+        _write_pool = ThreadPoolExecutor(max_workers=WRITER_THREADS)
+        _write_pool_pid = os.getpid()
+        _pending_writes.clear()
+    path = Path(path).resolve()
+    earlier = _pending_writes.get(path)
+    if earlier is not None:
+        earlier.result()  # keep last-write-wins order for repeated paths
+    _pending_writes[path] = _write_pool.submit(_write_file, path, data)
+
+
+def flush_writes():
+    """Wait for queued writes, re-raising the first failure."""
+    futures = list(_pending_writes.values())
+    _pending_writes.clear()
+    wait(futures)
+    for future in futures:
+        future.result()
+
+
+def remove_output(path: Path):
+    """Delete a stale output (deferred to publish_staging during a staged run)."""
+    path = Path(path).resolve()
+    if path != staged_path(path):
+        _staged_removals.add(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def begin_staging():
+    """Start a staged run: fresh staging directories next to each output root."""
+    STAGING_ROOTS.clear()
+    _staged_removals.clear()
+    for root in output_roots():
+        previous = root.with_name(f".{root.name}.previous")
+        if previous.exists() and not root.exists():
+            os.rename(previous, root)  # a publish was interrupted between its renames
+        stage = root.with_name(f".{root.name}.staging")
+        shutil.rmtree(stage, ignore_errors=True)
+        stage.mkdir(parents=True)
+        STAGING_ROOTS[root] = stage
+
+
+def publish_staging():
+    """Carry untouched live files into staging, then swap each staging dir into place."""
+    flush_writes()
+
+    def carry_over(root: Path, stage: Path, src: Path):
+        target = stage / src.relative_to(root)
+        if src not in _staged_removals and not target.exists():
+            link_or_copy(src, target)
+
+    with ThreadPoolExecutor(max_workers=WRITER_THREADS) as pool:
+        futures = [
+            pool.submit(carry_over, root, stage, src)
+            for root, stage in STAGING_ROOTS.items() if root.exists()
+            for src in root.rglob("*") if src.is_file()
+        ]
+        for future in futures:
+            future.result()
+
+    for root, stage in STAGING_ROOTS.items():
+        previous = root.with_name(f".{root.name}.previous")
+        shutil.rmtree(previous, ignore_errors=True)
+        if root.exists():
+            os.rename(root, previous)
+        os.rename(stage, root)
+        shutil.rmtree(previous, ignore_errors=True)
+    STAGING_ROOTS.clear()
+    _staged_removals.clear()
 
-def parse_docx():
-    """Parse the DOCX and return structured sections."""
-    print("\n=== STEP 1: Converting DOCX ===")
-    doc = Document(str(DOCX_PATH))
-    paras = doc.paragraphs
-
-    # Identify Title boundaries
-    title_indices = []
-    for i, p in enumerate(paras):
-        if p.style.name == "Title":
-            title_indices.append(i)
-
-    # Build section ranges: (start_idx, end_idx, title_text)
-    sections = []
-    for idx, start in enumerate(title_indices):
-        end = title_indices[idx + 1] if idx + 1 < len(title_indices) else len(paras)
-        sections.append((start, end, paras[start].text.strip()))
-
-    for start, end, title in sections:
-        if title == "Haarpflege Basics Kurs":
-            convert_course_transcripts(paras, start, end, title, "basics", "Haarpflege Basics")
-        elif title == "Haarpflege Basic 2":
-            convert_basics2(paras, start, end)
-        elif title == "Haarstyling Basic":
-            convert_course_transcripts(paras, start, end, title, "styling-basics", "Haarstyling Basics")
-        elif title == "Haarfplege Advanced Kurs":
-            convert_course_transcripts(paras, start, end, title, "advanced", "Haarpflege Advanced")
-        elif title == "Haarstyling Advanced":
-            convert_course_transcripts(paras, start, end, title, "styling-advanced", "Haarstyling Advanced")
-        elif title == "Häufige Fragen":
-            convert_qa(paras, start, end)
-        elif title.startswith("Linksammlung"):
-            convert_links(paras, start, end, title)
-        elif title.startswith("Produklisten"):
-            convert_products(paras, start, end)
-        elif title.startswith("Story"):
-            convert_story(paras, start, end)
-        elif title in ("Call Recordings", "Link Sammlungen") or title.startswith(("Buch", "Ton", "Graphiken")):
-            print(f"  Skipping placeholder section: {title}")
+
+# ---------------------------------------------------------------------------
+# NDJSON RECORD STREAM (--format ndjson)
+# ---------------------------------------------------------------------------
+#
+# One JSON object per line, emitted as soon as a converter produces it:
+#   {"kind": "document", "path", "sha256", "front_matter", "body"} per Markdown
+#   document (path relative to the Markdown root; sha256, front matter and body
+#   exactly as the file and index.jsonl would have them), and
+#   {"kind": "products", "path", "category", "products"} per product JSON file.
+# Nothing is written to disk and the manifest is bypassed: every source of the
+# selected stages is converted. The console log goes to stderr.
+
+def emit_record(record: dict):
+    """Write one record to RECORD_STREAM and flush it to the consumer."""
+    RECORD_STREAM.write(json.dumps(record, ensure_ascii=False) + "\n")
+    RECORD_STREAM.flush()
+
+
+def stream_records(stage_names: list[str], jobs: int, stream: io.TextIOBase) -> dict:
+    """Convert the given stages into NDJSON records on stream; returns the stage report."""
+    global RECORD_STREAM
+    apply_config({"STREAM_RECORDS": True})
+    RECORD_STREAM = stream
+    try:
+        return run_stages(None, stage_names, jobs=jobs)
+    finally:
+        RECORD_STREAM = None
+        apply_config({"STREAM_RECORDS": False})
+
+
+# ---------------------------------------------------------------------------
+# SOURCE MANIFEST (incremental conversion)
+# ---------------------------------------------------------------------------
+
+# Outputs written by the source unit currently being converted (None = not tracking).
+_recorded_outputs: dict[Path, None] | None = None
+
+
+def record_output(path: Path):
+    """Remember an output file written by the current source unit.
+
+    A path written twice by one unit means two titles slugified to the same
+    filename and the later one overwrote the earlier: warn instead of losing it
+    silently.
+    """
+    if _recorded_outputs is not None:
+        if path in _recorded_outputs:
+            print(f"  WARNING: {rel_key(path)} written twice (slug collision, last write wins)")
+        _recorded_outputs[path] = None
+
+
+def collect_outputs(convert, *args) -> list[Path]:
+    """Run a converter and return the output files it wrote."""
+    global _recorded_outputs
+    previous = _recorded_outputs
+    _recorded_outputs = {}
+    try:
+        convert(*args)
+        flush_writes()
+        return list(_recorded_outputs)
+    finally:
+        _recorded_outputs = previous
+
+
+def file_sha256(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's bytes."""
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def rel_key(path: Path) -> str:
+    """Manifest key for a path: POSIX path relative to the project root."""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(BASE_DIR).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def converter_fingerprint() -> str:
+    """Identity of the conversion logic: this script's hash plus output-shaping options."""
+    sha = file_sha256(Path(__file__))
+    if SEGMENT_TOKENS:
+        sha += f"+tokens={':'.join(map(str, SEGMENT_TOKENS))}"
+    if REDUCE_TRANSCRIPTS:
+        sha += "+reduced"
+    return sha
+
+
+def load_manifest() -> dict:
+    """Load the previous run's manifest, or an empty one if missing/incompatible."""
+    try:
+        data = json.loads((MD_DIR / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    if data.get("version") != MANIFEST_VERSION:
+        data = {}
+    return {"converter": data.get("converter"), "sources": data.get("sources", {}), "derived": data.get("derived", {})}
+
+
+def start_manifest_run(stage_names: list[str], force: bool = False) -> dict:
+    """Create the per-run state used by check_unit/record_unit/finish_manifest_run.
+
+    Sources of stages outside `stage_names` keep their manifest entries and
+    outputs; `force` reconverts every source of the selected stages.
+    """
+    previous = load_manifest()
+    return {
+        "previous": previous,
+        "stages": list(stage_names),
+        "force": force,
+        # A change to this script (or to --segment-tokens / --reduce-transcripts) invalidates every source.
+        "converter": converter_fingerprint(),
+        "sources": {},
+        # Derived outputs built from the documents (--fts indexes): path -> inputs hash.
+        "derived": dict(previous["derived"]),
+        "dirty": [],
+        "skipped": [],
+        "last_run": {},
+    }
+
+
+def source_fingerprint(path: Path, previous: dict | None) -> dict:
+    """Stat + hash a source, reusing the previous hash when size and mtime match."""
+    st = path.stat()
+    if previous and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns:
+        sha = previous["sha256"]
+    else:
+        sha = file_sha256(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+
+
+def check_unit(run: dict | None, stage: str, source_path: Path) -> dict | None:
+    """Decide whether a source unit needs converting.
+
+    Returns a pending entry to pass to record_unit() once the unit has been
+    converted, or None if the manifest shows the source (and the converter)
+    unchanged and every recorded output still exists. With run=None every unit
+    is converted and nothing is tracked.
+    """
+    if run is None:
+        return {}
+
+    key = rel_key(source_path)
+    previous = run["previous"]["sources"].get(key)
+    fingerprint = source_fingerprint(source_path, previous)
+    fingerprint["stage"] = stage
+    unchanged = (
+        not run["force"]
+        and previous is not None
+        and previous["sha256"] == fingerprint["sha256"]
+        and run["previous"]["converter"] == run["converter"]
+        and all((BASE_DIR / out).exists() for out in previous["outputs"])
+    )
+    if unchanged:
+        run["sources"][key] = {**fingerprint, "outputs": previous["outputs"]}
+        run["skipped"].append(key)
+        return None
+    return {"key": key, "fingerprint": fingerprint, "previous": previous}
+
+
+def record_unit(run: dict | None, pending: dict, outputs: list[Path]):
+    """Store a converted unit's output hashes and collect the dirty ones."""
+    if run is None:
+        return
+    hashes = {rel_key(out): file_sha256(staged_path(out)) for out in outputs}
+    previous_outputs = pending["previous"]["outputs"] if pending["previous"] else {}
+    for out, sha in hashes.items():
+        if previous_outputs.get(out) != sha:
+            run["dirty"].append(out)
+    run["sources"][pending["key"]] = {**pending["fingerprint"], "outputs": hashes}
+
+
+def write_manifest(run: dict):
+    """Save the run's manifest (again, after a derived output changed)."""
+    write_output(MD_DIR / MANIFEST_NAME, json.dumps({
+        "version": MANIFEST_VERSION,
+        "converter": run["converter"],
+        "sources": dict(sorted(run["sources"].items())),
+        "derived": dict(sorted(run["derived"].items())),
+        "last_run": run["last_run"],
+    }, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+def finish_manifest_run(run: dict) -> dict:
+    """Remove outputs no longer produced by any source, save the manifest, report.
+
+    Returns {"dirty": [...], "removed": [...], "outputs": {path: sha256}} (paths
+    relative to the project root; "outputs" is every output currently tracked).
+    """
+    for key, entry in run["previous"]["sources"].items():
+        if entry.get("stage") not in run["stages"] and key not in run["sources"]:
+            run["sources"][key] = entry
+    current = {out: sha for entry in run["sources"].values() for out, sha in entry["outputs"].items()}
+    removed = []
+    for entry in run["previous"]["sources"].values():
+        for out in entry["outputs"]:
+            if out in current or out in removed:
+                continue
+            remove_output(BASE_DIR / out)
+            removed.append(out)
+
+    dirty = sorted(set(run["dirty"]))
+    removed.sort()
+    run["last_run"] = {"dirty": dirty, "removed": removed}
+    write_manifest(run)
+
+    print(f"\n  {len(run['skipped'])} unchanged sources skipped, "
+          f"{len(dirty)} dirty outputs, {len(removed)} removed outputs")
+    for out in dirty:
+        print(f"    M {out}")
+    for out in removed:
+        print(f"    D {out}")
+    return {"dirty": dirty, "removed": removed, "outputs": dict(sorted(current.items()))}
+
+
+# ---------------------------------------------------------------------------
+# DOCUMENT INDEX (index.jsonl)
+# ---------------------------------------------------------------------------
+
+def parse_front_matter(text: str) -> tuple[dict, str]:
+    """Split a document written by write_md into (front_matter, body)."""
+    if not text.startswith("---\n"):
+        return {}, text
+    end = text.find("\n---\n", 3)
+    if end == -1:
+        return {}, text
+    front_matter: dict = {}
+    key = None
+    for line in text[4:end].split("\n"):
+        if line.startswith("  - ") and key is not None:
+            front_matter[key].append(line[4:].strip()[1:-1])
+        elif ":" in line:
+            key, _, value = line.partition(":")
+            value = value.strip()
+            front_matter[key] = value[1:-1] if value else []
+    return front_matter, text[end + 5:].strip()
+
+
+def load_records(path: Path) -> dict[str, dict]:
+    """Read a per-document JSONL sidecar keyed by "path" ({} if missing or unreadable)."""
+    records: dict[str, dict] = {}
+    try:
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                records[record["path"]] = record
+    except (OSError, ValueError, KeyError):
+        return {}
+    return records
+
+
+def write_records(path: Path, records: list[dict]):
+    """Write a per-document JSONL sidecar."""
+    lines = [json.dumps(record, ensure_ascii=False) for record in records]
+    write_output(path, ("\n".join(lines) + "\n" if lines else "").encode("utf-8"))
+
+
+def document_record(path: Path, sha256: str) -> dict:
+    """Index record for one generated Markdown document."""
+    data = staged_path(path).read_bytes()
+    front_matter, body = parse_front_matter(data.decode("utf-8"))
+    return {
+        "path": path.relative_to(MD_DIR).as_posix(),
+        "front_matter": front_matter,
+        "chars": len(body),
+        "bytes": len(data),
+        "sha256": sha256,
+    }
+
+
+def write_document_index(outputs: dict[str, str]) -> int:
+    """Write MD_DIR/index.jsonl: one record per tracked Markdown document.
+
+    Records of documents whose hash is unchanged are reused from the previous
+    index, so only new or changed files are read. Returns the record count.
+    """
+    previous = load_records(MD_DIR / INDEX_NAME)
+
+    records = []
+    for out, sha in outputs.items():
+        path = BASE_DIR / out
+        if path.suffix != ".md" or not path.is_relative_to(MD_DIR):
+            continue
+        record = previous.get(path.relative_to(MD_DIR).as_posix())
+        if record is None or record.get("sha256") != sha:
+            record = document_record(path, sha)
+        records.append(record)
+    write_records(MD_DIR / INDEX_NAME, records)
+    return len(records)
+
+
+# ---------------------------------------------------------------------------
+# CHUNK PLAN (chunk-plan.jsonl)
+# ---------------------------------------------------------------------------
+#
+# Mirrors the chunking strategies of scripts/ingest-markdown.ts so chunk counts
+# and embedding cost are known before ingestion. Ingestion reads the cleaned
+# tree (data/markdown-cleaned/: timestamps stripped, interjections dropped), so
+# a document that has a cleaned copy is planned over that copy; spans are then
+# [start, end) offsets into the cleaned body (text after the front matter) and
+# the record carries "cleaned_sha256". Documents without one are planned over
+# the body written here. Tokens use the same chars / 4 estimate as ingestion.
+# Keep CHUNK_CONFIG and the chunk_* functions in sync with ingest-markdown.ts.
+
+# Front-matter source_type -> DB source_type (mapSourceType in ingest-markdown.ts).
+DB_SOURCE_TYPES = {
+    "live_call_transcript": "live_call",
+}
+
+# DB source_type -> (chunk size, overlap, strategy) (CHUNK_CONFIG in ingest-markdown.ts).
+CHUNK_CONFIG = {
+    "book": (2000, 200, "structured"),
+    "transcript": (1600, 200, "recursive"),
+    "qa": (0, 0, "qa"),
+    "community_qa": (0, 0, "community_qa"),
+    "live_call": (1600, 200, "recursive"),
+    "live_call_transcript": (1600, 200, "recursive"),
+    "product_links": (800, 0, "natural"),
+    "product_list": (800, 0, "natural"),
+    "narrative": (2400, 400, "recursive"),
+}
+
+TRANSCRIPT_ANCHOR = re.compile(r'\[(\d{1,2}:\d{2}(?::\d{2})?)\]')
+QA_HEADER = re.compile(r'^## Frage (\d+)\s*\n+')
+H2_LINE = re.compile(r'\n## (.+)\n')
+
+
+def estimate_tokens(chars: int) -> int:
+    """Token estimate used by ingestion: ceil(chars / 4)."""
+    return -(-chars // 4)
+
+
+# Boundary strengths for pack_segments (how good a place to cut it is).
+BREAK_WEAK = 0       # between two lines of one paragraph
+BREAK_TIMESTAMP = 1  # before a cue / timestamped line
+BREAK_STRONG = 2     # speaker change or paragraph break
+
+
+def pack_segments(first_costs: list[int], next_costs: list[int], strengths: list[int],
+                  budget: tuple[int, int, int]) -> list[tuple[int, int]]:
+    """Group units into [start, end) runs that fit a (min, target, max) token budget.
+
+    first_costs[i] / next_costs[i] are unit i's chars when it opens / extends
+    a segment (the latter including its separator); strengths[i] rates the
+    boundary before unit i. A segment is closed before a unit that would take
+    it past max tokens, at a strong boundary once it has min tokens, and at a
+    timestamp boundary once it has target tokens. A last segment under min is
+    folded into the one before if the two fit in max. A single unit larger
+    than max is never split.
+    """
+    min_tokens, target, max_tokens = budget
+    bounds = []  # [start, end, chars]
+    start = 0
+    while start < len(first_costs):
+        chars = first_costs[start]
+        end = start + 1
+        while end < len(first_costs):
+            tokens = estimate_tokens(chars)
+            if (estimate_tokens(chars + next_costs[end]) > max_tokens
+                    or (strengths[end] == BREAK_STRONG and tokens >= min_tokens)
+                    or (strengths[end] >= BREAK_TIMESTAMP and tokens >= target)):
+                break
+            chars += next_costs[end]
+            end += 1
+        bounds.append([start, end, chars])
+        start = end
+    if len(bounds) > 1:
+        previous, last = bounds[-2], bounds[-1]
+        merged = previous[2] + last[2] - first_costs[last[0]] + next_costs[last[0]]
+        if estimate_tokens(last[2]) < min_tokens and estimate_tokens(merged) <= max_tokens:
+            previous[1:] = [last[1], merged]
+            bounds.pop()
+    return [(start, end) for start, end, _ in bounds]
+
+
+def _assert_pack_segments_smoke():
+    weak, timestamp, strong = [BREAK_WEAK] * 10, [BREAK_TIMESTAMP] * 10, [BREAK_STRONG] * 10
+    # Max: 40 + 41 chars = 21 tokens; a third unit would make 31 > 30.
+    assert pack_segments([40] * 10, [41] * 10, weak, (10, 20, 30)) == [(0, 2), (2, 4), (4, 6), (6, 8), (8, 10)]
+    # A strong boundary closes at min (11 >= 10 tokens), a timestamp only at target (21 >= 20).
+    assert pack_segments([20] * 6, [21] * 6, strong, (10, 20, 30)) == [(0, 2), (2, 4), (4, 6)]
+    assert pack_segments([20] * 6, [21] * 6, timestamp, (10, 20, 30)) == [(0, 4), (4, 6)]
+    assert pack_segments([30] * 7, [31] * 7, weak, (10, 20, 60)) == [(0, 7)]
+    # Tail under min (8 tokens) is folded into the previous segment when both fit in max ...
+    assert pack_segments([30] * 7, [31] * 7, timestamp, (10, 20, 60)) == [(0, 3), (3, 7)]
+    assert pack_segments([40, 40, 40, 40, 8], [41, 41, 41, 41, 9], weak, (10, 20, 30)) == [(0, 2), (2, 5)]
+    # ... and kept apart when they do not; a unit over max is never split.
+    assert pack_segments([110, 30], [111, 31], weak, (10, 20, 30)) == [(0, 1), (1, 2)]
+    assert pack_segments([200, 10], [201, 11], weak, (10, 20, 30)) == [(0, 1), (1, 2)]
+    assert pack_segments([], [], [], (10, 20, 30)) == []
+
+
+def trimmed_span(text: str, start: int, end: int) -> tuple[int, int]:
+    """Offsets of text[start:end] with surrounding whitespace removed."""
+    piece = text[start:end]
+    stripped = piece.strip()
+    if not stripped:
+        return start, start
+    lead = len(piece) - len(piece.lstrip())
+    return start + lead, start + lead + len(stripped)
+
+
+def chunk_recursive(text: str, size: int, overlap: int, offset: int = 0) -> list[tuple[int, int]]:
+    """chunkRecursive: windows of `size` ending at a paragraph or sentence break."""
+    spans = []
+    start = 0
+    min_advance = max(size - overlap, 100)
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            window = text[start:end]
+            last_paragraph = window.rfind("\n\n")
+            if last_paragraph > size * 0.4:
+                end = start + last_paragraph + 2
+            else:
+                break_point = max(window.rfind(". "), window.rfind("? "), window.rfind("! "))
+                if break_point > size * 0.4:
+                    end = start + break_point + 2
+        span_start, span_end = trimmed_span(text, start, end)
+        if span_end - span_start > 30:
+            spans.append((offset + span_start, offset + span_end))
+        start = max(end - overlap, start + min_advance)
+    return spans
+
+
+def chunk_structured(text: str, size: int, overlap: int, front_matter: dict) -> list[tuple[int, int, str]]:
+    """chunkStructured: split on H2, chunk each section, prefix 'Kapitel N: Title > H2'."""
+    title = front_matter.get("chapter_title", "")
+    number = front_matter.get("chapter", "")
+    h1_prefix = f"Kapitel {number}: {title}" if number else title
+    matches = list(H2_LINE.finditer(text))
+    if not matches:
+        return [(start, end, h1_prefix) for start, end in chunk_recursive(text, size, overlap)]
+
+    sections = []  # (heading, body_start, body_end)
+    intro_start, intro_end = trimmed_span(text, 0, matches[0].start())
+    intro = re.match(r'# .+\n*', text[intro_start:intro_end])
+    if intro:
+        intro_start, intro_end = trimmed_span(text, intro_start + intro.end(), intro_end)
+    if intro_end > intro_start:
+        sections.append(("", intro_start, intro_end))
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body_start, body_end = trimmed_span(text, match.end(), end)
+        if body_end > body_start:
+            sections.append((match.group(1).strip(), body_start, body_end))
+
+    spans = []
+    for heading, body_start, body_end in sections:
+        context = f"{h1_prefix} > {heading}" if heading else h1_prefix
+        for start, end in chunk_recursive(text[body_start:body_end], size, overlap, body_start):
+            spans.append((start, end, context))
+    return spans
+
+
+def chunk_qa(text: str) -> list[tuple[int, int]]:
+    """chunkQA: one chunk per '---'-separated block, without its '## Frage N' header."""
+    spans = []
+    pos = 0
+    for block in text.split("\n---\n"):
+        block_start, block_end = trimmed_span(text, pos, pos + len(block))
+        pos += len(block) + 5
+        cleaned = text[block_start:block_end]
+        if not cleaned or cleaned == "# Häufige Fragen":
+            continue
+        header = QA_HEADER.match(cleaned)
+        if header:
+            block_start, block_end = trimmed_span(text, block_start + header.end(), block_end)
+        if block_end - block_start > 20:
+            spans.append((block_start, block_end))
+    return spans
+
+
+def chunk_natural(text: str, max_size: int) -> list[tuple[int, int]]:
+    """chunkNatural: pack paragraphs up to max_size, skipping lone '# ' headers."""
+    spans = []
+    current_start = current_end = None
+    current_len = 0
+    pos = 0
+    for match in re.finditer(r'\n\n+|$', text):
+        para_start, para_end = trimmed_span(text, pos, match.start())
+        pos = match.end()
+        para_len = para_end - para_start
+        if para_len == 0:
+            continue
+        if text.startswith("# ", para_start) and para_len < 80:
+            continue
+        if current_len + para_len + 2 > max_size and current_len > 30:
+            spans.append((current_start, current_end))
+            current_start, current_len = None, 0
+        if current_start is None:
+            current_start, current_len = para_start, para_len
         else:
-            print(f"  WARNING: Unknown section '{title}' (paras {start}-{end})")
+            current_len += 2 + para_len
+        current_end = para_end
+    if current_start is not None and current_len > 30:
+        spans.append((current_start, current_end))
+    return spans
+
+
+def chunk_segments(text: str) -> list[tuple[int, int]]:
+    """chunkSegments: every paragraph of a token-budgeted document, skipping lone '# ' headers."""
+    spans = []
+    pos = 0
+    for match in re.finditer(r'\n\n+|$', text):
+        start, end = trimmed_span(text, pos, match.start())
+        pos = match.end()
+        if end > start and not (text.startswith("# ", start) and end - start < 80):
+            spans.append((start, end))
+    return spans
+
+
+def plan_chunks(front_matter: dict, body: str) -> dict:
+    """Chunk spans, anchors and token estimates for one document body."""
+    source_type = DB_SOURCE_TYPES.get(front_matter.get("source_type", ""), front_matter.get("source_type", ""))
+    size, overlap, strategy = CHUNK_CONFIG.get(source_type, CHUNK_CONFIG["transcript"])
+    if front_matter.get("segmentation") == "tokens":
+        strategy = "segments"
+        spans = [(start, end, "") for start, end in chunk_segments(body)]
+    elif strategy == "structured":
+        spans = chunk_structured(body, size, overlap, front_matter)
+    elif strategy == "qa":
+        spans = [(start, end, "") for start, end in chunk_qa(body)]
+    elif strategy == "natural":
+        spans = [(start, end, "") for start, end in chunk_natural(body, size)]
+    elif strategy == "community_qa":
+        # Community Q&A files come from a separate pipeline; not emitted here.
+        spans = []
+    else:
+        spans = [(start, end, "") for start, end in chunk_recursive(body, size, overlap)]
+
+    chunks = []
+    for start, end, prefix in spans:
+        chars = end - start + (len(prefix) + 2 if prefix else 0)
+        chunk = {"start": start, "end": end, "chars": chars, "tokens": estimate_tokens(chars)}
+        if prefix:
+            chunk["prefix"] = prefix
+        anchor = TRANSCRIPT_ANCHOR.search(body, start, end)
+        if anchor:
+            chunk["anchor"] = anchor.group(1)
+        chunks.append(chunk)
+    return {
+        "source_type": source_type,
+        "strategy": strategy,
+        "tokens": sum(chunk["tokens"] for chunk in chunks),
+        "chunks": chunks,
+    }
 
 
-def has_timestamp(text: str) -> bool:
-    """Check if a line starts with a timestamp like '0:00' or '00:00'."""
-    return bool(re.match(r'^\d{1,2}:\d{2}', text.strip()))
+def write_chunk_plan(outputs: dict[str, str]) -> dict:
+    """Write MD_DIR/chunk-plan.jsonl: one record per tracked Markdown document.
 
+    Documents with a copy in the cleaned tree are planned over that copy.
+    Plans whose document (and cleaned copy) hash is unchanged are reused from
+    the previous file. Returns {source_type: {"documents", "chunks", "tokens"}}.
+    """
+    previous = load_records(MD_DIR / CHUNK_PLAN_NAME)
+    cleaned_dir = MD_DIR.with_name(MD_DIR.name + CLEANED_SUFFIX)
+
+    records = []
+    totals: dict[str, dict] = {}
+    for out, sha in outputs.items():
+        path = BASE_DIR / out
+        if path.suffix != ".md" or not path.is_relative_to(MD_DIR):
+            continue
+        rel = path.relative_to(MD_DIR).as_posix()
+        record = previous.get(rel)
+        try:
+            cleaned = (cleaned_dir / rel).read_bytes()
+        except OSError:
+            cleaned = None
+        cleaned_sha = hashlib.sha256(cleaned).hexdigest() if cleaned is not None else None
+        if record is None or record.get("sha256") != sha or record.get("cleaned_sha256") != cleaned_sha:
+            if cleaned is None:
+                front_matter, body = parse_front_matter(staged_path(path).read_text(encoding="utf-8"))
+                record = {"path": rel, "sha256": sha}
+            else:
+                front_matter, body = parse_front_matter(cleaned.decode("utf-8"))
+                record = {"path": rel, "sha256": sha, "cleaned_sha256": cleaned_sha}
+            record.update(plan_chunks(front_matter, body))
+        records.append(record)
+        total = totals.setdefault(record["source_type"], {"documents": 0, "chunks": 0, "tokens": 0})
+        total["documents"] += 1
+        total["chunks"] += len(record["chunks"])
+        total["tokens"] += record["tokens"]
+    write_records(MD_DIR / CHUNK_PLAN_NAME, records)
+    return dict(sorted(totals.items()))
+
+
+# ---------------------------------------------------------------------------
+# SEGMENT FINGERPRINTS (segments.jsonl)
+# ---------------------------------------------------------------------------
+#
+# Every converter emits its units as blank-line separated paragraphs
+# (merge_transcript_paragraphs, merge_vtt_cues, clean_pdf_text) or as
+# '---'-separated question blocks (convert_qa), so segments are recovered from
+# the written body. A fingerprint hashes the normalized text (case, whitespace,
+# [MM:SS] markers and **speaker:** bold ignored); the anchor is the segment's
+# timestamp, else its ordinal. Question blocks drop their numbered '## Frage N'
+# header (and the document H1 ahead of the first one) and are anchored on the
+# question's first words, so inserting a question leaves the later ones
+# unchanged. Comparing two runs' sidecars shows exactly which segments to
+# re-embed.
+
+QA_SEPARATOR = re.compile(r'\n\n---\n\n')
+PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+SEGMENT_NOISE = re.compile(r'\[\d{1,2}:\d{2}(?::\d{2})?\]|\*\*|\s+')
+# Document H1 and numbered header at the top of a question block.
+QA_BLOCK_HEADER = re.compile(r'(?:# [^\n]*\n\s*)?(?:## Frage \d+[ \t]*(?:\n\s*|$))?')
+QUESTION_ANCHOR_WORDS = 8
+
+
+def segment_fingerprint(text: str) -> str:
+    """Hash of a segment's normalized text."""
+    normalized = " ".join(SEGMENT_NOISE.sub(" ", text.casefold()).split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def segment_anchor(text: str, ordinal: int) -> str:
+    """Positional anchor: the leading [MM:SS] timestamp, or '#ordinal'."""
+    timestamp = TRANSCRIPT_ANCHOR.match(text)
+    if timestamp:
+        return timestamp.group(1)
+    return f"#{ordinal}"
+
+
+def question_anchor(text: str, seen: set[str]) -> str:
+    """Anchor of a question block: slug of its first words, unique within the document."""
+    base = slugify(" ".join(text.split()[:QUESTION_ANCHOR_WORDS])) or "frage"
+    anchor = base
+    while anchor in seen:
+        anchor = f"{base}-{len(seen)}"
+    seen.add(anchor)
+    return anchor
+
+
+def document_segments(front_matter: dict, body: str) -> list[dict]:
+    """Split a body into fingerprinted segments with [start, end) offsets."""
+    qa = front_matter.get("source_type") == "qa"
+    separator = QA_SEPARATOR if qa else PARAGRAPH_SEPARATOR
+    segments = []
+    anchors: set[str] = set()
+    pos = 0
+    for match in itertools.chain(separator.finditer(body), [None]):
+        start, end = trimmed_span(body, pos, match.start() if match else len(body))
+        pos = match.end() if match else len(body)
+        if qa and end > start:
+            start = QA_BLOCK_HEADER.match(body, start, end).end()
+        if end <= start:
+            continue
+        text = body[start:end]
+        segments.append({
+            "anchor": question_anchor(text, anchors) if qa else segment_anchor(text, len(segments)),
+            "fp": segment_fingerprint(text),
+            "start": start,
+            "end": end,
+            "minhash": encode_minhash(minhash_signature(text)),
+        })
+    return segments
+
+
+def diff_segments(old: list[dict], new: list[dict]) -> dict:
+    """Align two segment lists by fingerprint.
+
+    Returns {"added": [...], "removed": [...], "changed": [(old, new), ...],
+    "unchanged": n}; 'changed' pairs segments replaced in place.
+    """
+    matcher = difflib.SequenceMatcher(a=[s["fp"] for s in old], b=[s["fp"] for s in new], autojunk=False)
+    result = {"added": [], "removed": [], "changed": [], "unchanged": 0}
+    for op, a1, a2, b1, b2 in matcher.get_opcodes():
+        if op == "equal":
+            result["unchanged"] += a2 - a1
+            continue
+        paired = min(a2 - a1, b2 - b1) if op == "replace" else 0
+        result["changed"].extend(zip(old[a1:a1 + paired], new[b1:b1 + paired]))
+        result["removed"].extend(old[a1 + paired:a2])
+        result["added"].extend(new[b1 + paired:b2])
+    return result
+
+
+def _assert_qa_segment_diff_smoke():
+    def qa_body(questions: list[str]) -> str:
+        blocks = [f"## Frage {n}\n\n{question}" for n, question in enumerate(questions, 1)]
+        return "# Häufige Fragen\n\n" + "\n\n---\n\n".join(blocks) + "\n"
+
+    questions = ["Wie oft Öl?\nAntwort: selten.", "Was ist mit Protein?\n\nMehr Text.", "Hi, ich nochmal."]
+    old_body = qa_body(questions)
+    old = document_segments({"source_type": "qa"}, old_body)
+    assert old_body[old[0]["start"]:old[0]["end"]] == questions[0]  # no H1, no '## Frage 1'
+    assert [s["anchor"] for s in old] == ["wie-oft-oel-antwort-selten", "was-ist-mit-protein-mehr-text", "hi-ich-nochmal"]
+    # Inserting a question renumbers the later ones; only the new one differs.
+    new = document_segments({"source_type": "qa"}, qa_body(questions[:1] + ["Neue Frage?"] + questions[1:]))
+    diff = diff_segments(old, new)
+    assert [s["anchor"] for s in diff["added"]] == ["neue-frage"]
+    assert not diff["removed"] and not diff["changed"] and diff["unchanged"] == 3
+    assert [s["anchor"] for s in new] == ["wie-oft-oel-antwort-selten", "neue-frage",
+                                          "was-ist-mit-protein-mehr-text", "hi-ich-nochmal"]
+
+
+def diff_segment_records(old: dict[str, dict], new: dict[str, dict]) -> dict:
+    """Per-document segment diffs between two segments.jsonl snapshots (changed docs only)."""
+    diffs = {}
+    for path in sorted(old.keys() | new.keys()):
+        old_record, new_record = old.get(path), new.get(path)
+        if old_record and new_record and old_record["sha256"] == new_record["sha256"]:
+            continue
+        diff = diff_segments(
+            old_record["segments"] if old_record else [],
+            new_record["segments"] if new_record else [],
+        )
+        diffs[path] = {
+            "added": [s["anchor"] for s in diff["added"]],
+            "removed": [s["anchor"] for s in diff["removed"]],
+            "changed": [new_segment["anchor"] for _, new_segment in diff["changed"]],
+            "unchanged": diff["unchanged"],
+        }
+    return diffs
+
+
+def write_segment_fingerprints(outputs: dict[str, str]) -> tuple[dict[str, dict], dict]:
+    """Write MD_DIR/segments.jsonl; return its records by path and the diff against the last run."""
+    previous = load_records(MD_DIR / SEGMENTS_NAME)
+    records = {}
+    for out, sha in outputs.items():
+        path = BASE_DIR / out
+        if path.suffix != ".md" or not path.is_relative_to(MD_DIR):
+            continue
+        rel = path.relative_to(MD_DIR).as_posix()
+        record = previous.get(rel)
+        if record is None or record.get("sha256") != sha or record.get("version") != SEGMENTS_VERSION:
+            front_matter, body = parse_front_matter(read_output(path))
+            record = {"path": rel, "sha256": sha, "version": SEGMENTS_VERSION,
+                      "segments": document_segments(front_matter, body)}
+        records[rel] = record
+    write_records(MD_DIR / SEGMENTS_NAME, list(records.values()))
+    return records, diff_segment_records(previous, records)
+
+
+def print_segment_diff(diffs: dict):
+    """Console summary of diff_segment_records output."""
+    totals = {key: sum(len(d[key]) for d in diffs.values()) for key in ("added", "removed", "changed")}
+    print(f"\n  Segments: {totals['added']} added, {totals['removed']} removed, "
+          f"{totals['changed']} changed in {len(diffs)} documents")
+    for path, diff in diffs.items():
+        parts = [f"{key} {', '.join(diff[key])}" for key in ("added", "removed", "changed") if diff[key]]
+        if parts:
+            print(f"    {path}: " + "; ".join(parts))
+
+
+# ---------------------------------------------------------------------------
+# NEAR-DUPLICATE SEGMENTS (near-duplicates.json)
+# ---------------------------------------------------------------------------
+#
+# The same content reaches the corpus more than once: live-call topics appear
+# in VTT conversions and in DOCX course transcripts, community questions repeat
+# with small wording changes. Every segment of segments.jsonl with enough words
+# gets a MinHash signature over its word shingles; LSH banding only compares
+# segments that share a band, so the cost grows with the corpus, not with the
+# number of segment pairs. Pairs whose estimated Jaccard similarity reaches
+# the threshold are clustered, and every cluster member after the first (in
+# path and offset order) is reported with its span so ingestion can skip it.
+# Signatures are stored with the fingerprints in segments.jsonl, so only new
+# or changed documents are hashed, and a run that changed no output reuses
+# the previous near-duplicates.json.
+
+SHINGLE_WORDS = 3
+MIN_SHINGLE_WORDS = 8
+MINHASH_BANDS = 16
+MINHASH_ROWS = 4
+MINHASH_PRIME = (1 << 61) - 1
+_minhash_rng = random.Random(20250610)
+MINHASH_PERMUTATIONS = [
+    (_minhash_rng.randrange(1, MINHASH_PRIME), _minhash_rng.randrange(MINHASH_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+SHINGLE_WORD = re.compile(r'\w+')
+
+
+def minhash_signature(text: str) -> list[int] | None:
+    """MinHash signature of a segment's word shingles (None if it is too short to compare)."""
+    words = SHINGLE_WORD.findall(SEGMENT_NOISE.sub(" ", text.casefold()))
+    if len(words) < MIN_SHINGLE_WORDS:
+        return None
+    hashes = {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"), digest_size=8).digest(), "big")
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+    return [min((a * h + b) % MINHASH_PRIME for h in hashes) for a, b in MINHASH_PERMUTATIONS]
+
+
+def encode_minhash(signature: list[int] | None) -> str | None:
+    """Signature as one hex string (16 digits per value) for segments.jsonl."""
+    return None if signature is None else "".join(f"{value:016x}" for value in signature)
 
-def strip_timestamp(text: str) -> str:
-    """Remove leading timestamp from text."""
-    return re.sub(r'^\d{1,2}:\d{2}(:\d{2})?\s*', '', text.strip())
 
+def decode_minhash(encoded: str | None) -> list[int] | None:
+    """Inverse of encode_minhash."""
+    if encoded is None:
+        return None
+    return [int(encoded[i:i + 16], 16) for i in range(0, len(encoded), 16)]
 
-def extract_timestamp(text: str) -> str:
-    """Extract the timestamp from the beginning of text."""
-    m = re.match(r'^(\d{1,2}:\d{2}(:\d{2})?)', text.strip())
-    return m.group(1) if m else ""
+
+def find_near_duplicates(records: dict[str, dict], threshold: float) -> list[dict]:
+    """Cluster near-duplicate segments of the given segments.jsonl records.
+
+    Returns clusters as {"canonical": segment, "duplicates": [segment + "similarity"]},
+    where a segment is {"path", "anchor", "start", "end"}.
+    """
+    segments = []
+    signatures = []
+    for path in sorted(records):
+        for segment in records[path]["segments"]:
+            signature = decode_minhash(segment["minhash"])
+            if signature is not None:
+                segments.append({"path": path, "anchor": segment["anchor"],
+                                 "start": segment["start"], "end": segment["end"]})
+                signatures.append(signature)
+
+    def similarity(i: int, j: int) -> float:
+        return sum(x == y for x, y in zip(signatures[i], signatures[j])) / len(signatures[i])
+
+    # Union-find over verified candidate pairs; each bucket member is checked
+    # against the bucket's first member only, so a bucket costs O(size).
+    parent = list(range(len(segments)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(MINHASH_BANDS):
+        rows = slice(band * MINHASH_ROWS, (band + 1) * MINHASH_ROWS)
+        buckets: dict[tuple, list[int]] = {}
+        for i, signature in enumerate(signatures):
+            buckets.setdefault(tuple(signature[rows]), []).append(i)
+        for members in buckets.values():
+            first = members[0]
+            for other in members[1:]:
+                if find(first) == find(other):
+                    continue
+                if similarity(first, other) >= threshold:
+                    parent[find(other)] = find(first)
+
+    clusters: dict[int, list[int]] = {}
+    for i in range(len(segments)):
+        clusters.setdefault(find(i), []).append(i)
+    result = []
+    for members in clusters.values():
+        if len(members) < 2:
+            continue
+        canonical, *duplicates = sorted(members)
+        result.append({
+            "canonical": segments[canonical],
+            "duplicates": [{**segments[i], "similarity": round(similarity(canonical, i), 3)} for i in duplicates],
+        })
+    return result
+
+
+def write_near_duplicates(records: dict[str, dict], threshold: float, changed: bool = True) -> dict:
+    """Write MD_DIR/near-duplicates.json and return its totals.
+
+    With changed=False (no output was rewritten or removed this run) the
+    previous file is kept if it was computed with the same threshold and
+    segmentation (SEGMENTS_VERSION).
+    """
+    if not changed:
+        try:
+            previous = json.loads(read_output(MD_DIR / NEAR_DUPLICATES_NAME))
+        except (OSError, ValueError):
+            previous = {}
+        if (previous.get("threshold") == threshold and previous.get("segments_version") == SEGMENTS_VERSION
+                and "totals" in previous):
+            return previous["totals"]
+    clusters = find_near_duplicates(records, threshold)
+    duplicates = [d for cluster in clusters for d in cluster["duplicates"]]
+    totals = {
+        "clusters": len(clusters),
+        "duplicate_segments": len(duplicates),
+        "duplicate_chars": sum(d["end"] - d["start"] for d in duplicates),
+    }
+    write_output(MD_DIR / NEAR_DUPLICATES_NAME, json.dumps(
+        {"threshold": threshold, "segments_version": SEGMENTS_VERSION, "totals": totals, "clusters": clusters},
+        ensure_ascii=False, indent=2,
+    ).encode("utf-8"))
+    return totals
+
+
+# ---------------------------------------------------------------------------
+# FULL-TEXT INDEX (--fts, SQLite FTS5)
+# ---------------------------------------------------------------------------
+#
+# Offline BM25 lookups without Supabase: one FTS5 row per document and per
+# segment, with the front-matter fields retrieval filters on as columns. Text
+# and query are folded like slugify (lowercase, ä -> ae, ö -> oe, ü -> ue,
+# ß -> ss), so "Kopfhaut-Öl", "kopfhaut oel" and the slugs in paths all match.
+
+FTS_COLUMNS = ("source_type", "course", "module", "chapter", "category", "thickness", "concern", "topic")
+FTS_QUERY_TERM = re.compile(r"\b(?!(?:AND|OR|NOT|NEAR)\b)\w+")
+
+
+def build_fts_index(path: Path, records: dict[str, dict]):
+    """Write a SQLite FTS5 index of every document and segment in records (segments.jsonl).
+
+    The database is built next to its staged location and renamed into place.
+    """
+    columns = ", ".join(FTS_COLUMNS)
+    target = staged_path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    os.close(fd)
+    try:
+        with contextlib.closing(sqlite3.connect(tmp)) as db:
+            db.execute(f"CREATE VIRTUAL TABLE documents USING fts5("
+                       f"path UNINDEXED, front_matter UNINDEXED, {columns}, title, body)")
+            db.execute(f"CREATE VIRTUAL TABLE segments USING fts5("
+                       f"path UNINDEXED, anchor UNINDEXED, start UNINDEXED, end UNINDEXED, {columns}, body)")
+            for rel, record in sorted(records.items()):
+                front_matter, body = parse_front_matter(read_output(MD_DIR / rel))
+                fields = [fold_text(str(front_matter.get(column, ""))) for column in FTS_COLUMNS]
+                title = next((line[2:] for line in body.splitlines() if line.startswith("# ")), "")
+                db.execute(
+                    f"INSERT INTO documents VALUES (?, ?, {', '.join('?' * len(FTS_COLUMNS))}, ?, ?)",
+                    [rel, json.dumps(front_matter, ensure_ascii=False), *fields, fold_text(title), fold_text(body)],
+                )
+                db.executemany(
+                    f"INSERT INTO segments VALUES (?, ?, ?, ?, {', '.join('?' * len(FTS_COLUMNS))}, ?)",
+                    [
+                        [rel, segment["anchor"], segment["start"], segment["end"], *fields,
+                         fold_text(body[segment["start"]:segment["end"]])]
+                        for segment in record["segments"]
+                    ],
+                )
+            db.execute("INSERT INTO documents(documents) VALUES ('optimize')")
+            db.execute("INSERT INTO segments(segments) VALUES ('optimize')")
+            db.commit()
+        os.replace(tmp, target)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+
+
+def update_fts_index(run: dict, path: Path | None, records: dict[str, dict]) -> bool:
+    """Keep the manifest's FTS indexes in step with the documents; True if `path` was rebuilt.
+
+    An index is a derived output: the manifest records the hash of its inputs
+    (converter + every document hash). The index at `path` (--fts; None
+    without it) is rebuilt unless that hash is unchanged; any other recorded
+    index whose inputs changed is removed rather than left stale.
+    """
+    documents = sorted((rel, record["sha256"]) for rel, record in records.items())
+    inputs = hashlib.sha256(json.dumps([run["converter"], documents]).encode("utf-8")).hexdigest()
+    key = rel_key(path) if path is not None else None
+    derived = run["derived"]
+    before = dict(derived)
+    for out, built_from in before.items():
+        if out != key and built_from != inputs:
+            remove_output(BASE_DIR / out)
+            del derived[out]
+    rebuilt = key is not None and not (derived.get(key) == inputs and path.exists())
+    if rebuilt:
+        build_fts_index(path, records)
+        derived[key] = inputs
+    if derived != before:
+        write_manifest(run)
+    return rebuilt
+
+
+def search_fts_index(path: Path, query: str, limit: int = 10) -> list[tuple]:
+    """BM25-ranked segments matching an FTS5 query: (path, anchor, score, snippet)."""
+    with contextlib.closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True)) as db:
+        return db.execute(
+            "SELECT path, anchor, round(bm25(segments), 3), snippet(segments, -1, '[', ']', ' … ', 12) "
+            "FROM segments WHERE segments MATCH ? ORDER BY rank LIMIT ?",
+            (FTS_QUERY_TERM.sub(lambda m: fold_text(m.group()), query), limit),
+        ).fetchall()
+
+
+# ---------------------------------------------------------------------------
+# DOCX PARAGRAPH READERS
+# ---------------------------------------------------------------------------
+#
+# Both readers yield (index, style name, text) for every body-level paragraph,
+# exactly as python-docx's doc.paragraphs / p.style.name / p.text report them.
+# The streaming reader parses word/document.xml incrementally and drops each
+# top-level block once read, so memory stays bounded by the largest paragraph
+# or table rather than the whole document tree.
+
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+STYLES_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles"
+
+# styles.xml names that python-docx reports under their UI name (BabelFish).
+DOCX_UI_STYLE_NAMES = {
+    "caption": "Caption",
+    "footer": "Footer",
+    "header": "Header",
+    **{f"heading {n}": f"Heading {n}" for n in range(1, 10)},
+}
+
+# Run children with a text equivalent (w:br is handled separately: only
+# text-wrapping breaks count as a newline).
+RUN_TEXT = {W_NS + "tab": "\t", W_NS + "ptab": "\t", W_NS + "cr": "\n", W_NS + "noBreakHyphen": "-"}
+
+
+def docx_part_targets(package: zipfile.ZipFile) -> tuple[str, str | None]:
+    """Zip names of the main document part and its styles part."""
+    document = "word/document.xml"
+    with contextlib.suppress(KeyError):
+        for rel in ET.fromstring(package.read("_rels/.rels")).iter(PACKAGE_REL_NS + "Relationship"):
+            if rel.get("Type") == OFFICE_DOCUMENT_REL:
+                document = rel.get("Target").lstrip("/")
+    folder, _, name = document.rpartition("/")
+    styles = None
+    with contextlib.suppress(KeyError):
+        rels = ET.fromstring(package.read(f"{folder}/_rels/{name}.rels"))
+        for rel in rels.iter(PACKAGE_REL_NS + "Relationship"):
+            if rel.get("Type") == STYLES_REL:
+                target = rel.get("Target")
+                styles = target.lstrip("/") if target.startswith("/") else f"{folder}/{target}"
+    return document, styles
+
+
+def docx_paragraph_styles(package: zipfile.ZipFile, styles_part: str | None) -> tuple[dict[str, str], str | None]:
+    """Paragraph style id -> name from styles.xml, plus the default paragraph style name."""
+    names: dict[str, str] = {}
+    default = None
+    if styles_part is None or styles_part not in package.namelist():
+        return names, default
+    for style in ET.fromstring(package.read(styles_part)).iter(W_NS + "style"):
+        if style.get(W_NS + "type") != "paragraph":
+            continue
+        name_element = style.find(W_NS + "name")
+        name = name_element.get(W_NS + "val") if name_element is not None else None
+        name = sys.intern(DOCX_UI_STYLE_NAMES.get(name, name)) if name is not None else None
+        names[style.get(W_NS + "styleId")] = name
+        if style.get(W_NS + "default") in ("1", "true", "on") and default is None:
+            default = name
+    return names, default
+
+
+def run_text(run: ET.Element) -> str:
+    """Text of a w:r element (python-docx CT_R.text)."""
+    parts = []
+    for child in run:
+        if child.tag == W_NS + "t":
+            parts.append(child.text or "")
+        elif child.tag == W_NS + "br":
+            if child.get(W_NS + "type", "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif child.tag in RUN_TEXT:
+            parts.append(RUN_TEXT[child.tag])
+    return "".join(parts)
+
+
+def paragraph_text(paragraph: ET.Element) -> str:
+    """Text of a w:p element: its runs and hyperlink runs (python-docx CT_P.text)."""
+    parts = []
+    for child in paragraph:
+        if child.tag == W_NS + "r":
+            parts.append(run_text(child))
+        elif child.tag == W_NS + "hyperlink":
+            parts.extend(run_text(run) for run in child.findall(W_NS + "r"))
+    return "".join(parts)
+
+
+def iter_docx_stream(source_path: Path) -> Iterator[tuple[int, str, str]]:
+    """Stream body-level paragraphs from word/document.xml with iterparse."""
+    with zipfile.ZipFile(source_path) as package:
+        document_part, styles_part = docx_part_targets(package)
+        style_names, default_style = docx_paragraph_styles(package, styles_part)
+        with package.open(document_part) as xml:
+            body = None
+            depth = 0
+            index = 0
+            for event, element in ET.iterparse(xml, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if body is None and element.tag == W_NS + "body":
+                        body, body_depth = element, depth
+                    continue
+                depth -= 1
+                if body is None or depth != body_depth:
+                    continue
+                # A top-level block of w:body is complete.
+                if element.tag == W_NS + "p":
+                    style_element = element.find(f"{W_NS}pPr/{W_NS}pStyle")
+                    style_id = style_element.get(W_NS + "val") if style_element is not None else None
+                    style = style_names.get(style_id) if style_id else None
+                    yield index, style if style is not None else default_style, paragraph_text(element)
+                    index += 1
+                body.remove(element)
+
+
+def iter_python_docx(source_path: Path) -> Iterator[tuple[int, str, str]]:
+    """Paragraphs via the python-docx object model (loads the whole document)."""
+    from docx import Document
+
+    for index, paragraph in enumerate(Document(str(source_path)).paragraphs):
+        yield index, paragraph.style.name, paragraph.text
+
+
+DOCX_READERS = {"stream": iter_docx_stream, "python-docx": iter_python_docx}
+
+
+# ---------------------------------------------------------------------------
+# EXTRACTION CACHE
+# ---------------------------------------------------------------------------
+#
+# Parsing the DOCX object model and running pdftotext dominate the DOCX and PDF
+# stages. Their results are stored under EXTRACT_CACHE_DIR, keyed by the
+# source's SHA-256 and the extractor (flags, library version), so re-running
+# after a change to chapter_topics, the cleaning rules or a section handler
+# skips extraction. Only the newest entry per source and extractor is kept.
+
+PDFTOTEXT_ARGS = ["pdftotext", "-layout"]
+# Concurrent pdftotext calls per book (--pdf-extract pages).
+PDF_WORKERS = 4
+
+
+class ParagraphTable(NamedTuple):
+    """DOCX paragraphs as columns: stripped text, style name and line tags (see classify_line)."""
+    texts: list[str]
+    styles: list[str]
+    kinds: list[str]
+    timestamps: list[str]
+    body_starts: list[int]
+
+
+def docx_extractor() -> str:
+    """Identity of the DOCX paragraph extractor (part of the cache key)."""
+    if DOCX_READER == "stream":
+        return "docx-stream paragraphs v1"
+    try:
+        version = importlib.metadata.version("python-docx")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    return f"python-docx {version} paragraphs v1"
+
+
+def cache_path(source_path: Path, extractor: str, suffix: str) -> Path | None:
+    """Cache file for a source/extractor pair (None if caching is disabled)."""
+    if EXTRACT_CACHE_DIR is None:
+        return None
+    key = hashlib.sha256(f"{file_sha256(source_path)}\0{extractor}".encode("utf-8")).hexdigest()[:24]
+    prefix = f"{slugify(source_path.name)}-{slugify(extractor)}"
+    return EXTRACT_CACHE_DIR / f"{prefix}-{key}{suffix}"
+
+
+def cache_temp(path: Path) -> tuple[int, str]:
+    """Open a temp file next to a cache entry (fd, name); publish it with publish_cache."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+
+
+def publish_cache(tmp: str, path: Path):
+    """Move a finished temp file into place, dropping older entries of the same source and extractor."""
+    prefix = path.name.rsplit("-", 1)[0]
+    for stale in path.parent.glob(f"{prefix}-*"):
+        if stale != path and stale.name.rsplit("-", 1)[0] == prefix:
+            stale.unlink(missing_ok=True)
+    os.replace(tmp, path)
+
+
+def write_cache(path: Path, data: bytes):
+    """Atomically store a cache entry."""
+    fd, tmp = cache_temp(path)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    publish_cache(tmp, path)
+
+
+def docx_paragraph_rows(source_path: Path) -> Iterator[tuple[int, str, str]]:
+    """(index, style, stripped text) per DOCX paragraph, from the cache or the DOCX_READER.
+
+    Rows are yielded as they are read and appended to the cache entry (one
+    JSON [style, text] per line) as they go, so neither path holds the whole
+    document. The entry is published only once every row has been consumed.
+    """
+    path = cache_path(source_path, docx_extractor(), ".jsonl")
+    if path is not None and path.exists():
+        count("extract_cache_hits")
+        with path.open(encoding="utf-8") as f:
+            for index, line in enumerate(f):
+                style, text = json.loads(line)
+                yield index, style, text
+        return
+
+    rows = ((index, style, text.strip()) for index, style, text in DOCX_READERS[DOCX_READER](source_path))
+    if path is None:
+        yield from rows
+        return
+    fd, tmp = cache_temp(path)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for index, style, text in rows:
+                f.write(json.dumps([style, text], ensure_ascii=False) + "\n")
+                yield index, style, text
+        publish_cache(tmp, path)
+    finally:
+        Path(tmp).unlink(missing_ok=True)
+
+
+def extract_pdf_text(source_path: Path) -> str:
+    """pdftotext output for a PDF, from the cache or by running pdftotext."""
+    path = cache_path(source_path, " ".join(PDFTOTEXT_ARGS), ".txt")
+    if path is not None and path.exists():
+        count("extract_cache_hits")
+        return path.read_text(encoding="utf-8")
+
+    result = subprocess.run(
+        [*PDFTOTEXT_ARGS, str(source_path), "-"],
+        capture_output=True, text=True
+    )
+    if path is not None and result.returncode == 0:
+        write_cache(path, result.stdout.encode("utf-8"))
+    return result.stdout
+
+
+# ---------------------------------------------------------------------------
+# DOCX SECTION MEMO
+# ---------------------------------------------------------------------------
+#
+# data/markdown/.sections-<docx>.json maps a section key (hash of the handler,
+# its arguments and the section's paragraph texts and styles) to the outputs
+# it produced. When the DOCX changes, only sections whose key is new are
+# reconverted; the others rewrite their previous bytes (hard-linked, so inode
+# and mtime survive). A changed converter script invalidates the memo.
+
+def section_key(convert, args: tuple, paras: ParagraphTable) -> str:
+    """Hash of a section's handler identity and paragraph range."""
+    digest = hashlib.sha256(json.dumps([convert.__name__, list(args)], ensure_ascii=False).encode("utf-8"))
+    for style, text in zip(paras.styles, paras.texts):
+        digest.update(f"\0{style}\0{text}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_section_memo(path: Path) -> dict:
+    """Previous run's section memo ({} if missing, unreadable or from another converter)."""
+    try:
+        memo = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if memo.get("converter") != converter_fingerprint():
+        return {}
+    return memo.get("sections", {})
+
+
+def reuse_section(entry: dict | None) -> list[Path] | None:
+    """Rewrite a memoized section's outputs from the live tree.
+
+    Returns the output paths, or None if any recorded output is missing or
+    no longer has the recorded bytes (the section is then reconverted).
+    """
+    if entry is None:
+        return None
+    outputs = []
+    for out, sha in entry["outputs"].items():
+        path = BASE_DIR / out
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != sha:
+            return None
+        outputs.append((path, data))
+    for path, data in outputs:
+        write_output(path, data)
+    return [path for path, _ in outputs]
+
+
+# ---------------------------------------------------------------------------
+# 1. DOCX CONVERSION
+# ---------------------------------------------------------------------------
+
+def parse_docx(run: dict | None = None, jobs: int = 1):
+    """Convert the source DOCX unless the manifest shows it unchanged."""
+    run_stages(run, ["docx"], jobs)
+
+
+def docx_units() -> tuple[list[str], list[tuple]]:
+    """Stage 1 work: the source DOCX is a single unit; in corpus mode, one unit per DOCX."""
+    if CORPUS_ROOTS:
+        documents = corpus_documents(".docx")
+        notes = [f"  Found {len(documents)} DOCX documents in corpus"]
+        return notes, [(path, convert_document, (namespace, convert_docx_sections, path))
+                       for path, namespace in documents]
+    path = docx_path()
+    return [], [(path, convert_docx_sections, (path,))]
+
+
+def convert_docx_sections(source_path: Path):
+    """Stream the DOCX and dispatch each Title section as soon as it is complete.
+
+    Sections whose paragraphs and handler match the previous run's section
+    memo reuse their recorded outputs instead of being reconverted.
+    """
+    memo_path = document_dir() / f".sections-{slugify(source_path.name)}.json"
+    memo = load_section_memo(memo_path) if REUSE_SECTIONS and not STREAM_RECORDS else {}
+    sections = {}
+    for offset, paras in docx_sections(docx_paragraph_rows(source_path)):
+        sections.update(convert_docx_section(offset, paras, memo))
+    if not STREAM_RECORDS:
+        write_output(memo_path, json.dumps({
+            "converter": converter_fingerprint(),
+            "sections": sections,
+        }, ensure_ascii=False, indent=2).encode("utf-8"))
+        record_output(memo_path)
+
+
+def docx_sections(rows: Iterator[tuple[int, str, str]]) -> Iterator[tuple[int, ParagraphTable]]:
+    """Group paragraph rows into Title-delimited sections in one forward pass.
+
+    Yields (index of the Title paragraph, section table whose row 0 is the
+    Title); paragraphs before the first Title belong to no section. Each row
+    is classified once on the way in.
+    """
+    offset, section = None, None
+    for index, style, text in rows:
+        if style == "Title":
+            if section is not None:
+                yield offset, section
+            offset, section = index, ParagraphTable([], [], [], [], [])
+        if section is not None:
+            kind, timestamp, body_start = classify_line(text)
+            section.texts.append(text)
+            section.styles.append(style)
+            section.kinds.append(kind)
+            section.timestamps.append(timestamp)
+            section.body_starts.append(body_start)
+    if section is not None:
+        yield offset, section
+
+
+def section_handler(title: str) -> tuple | None:
+    """(converter, extra args) for a Title section; None for placeholder/unknown sections."""
+    if title == "Haarpflege Basics Kurs":
+        return convert_course_transcripts, (title, "basics", "Haarpflege Basics")
+    if title == "Haarpflege Basic 2":
+        return convert_basics2, ()
+    if title == "Haarstyling Basic":
+        return convert_course_transcripts, (title, "styling-basics", "Haarstyling Basics")
+    if title == "Haarfplege Advanced Kurs":
+        return convert_course_transcripts, (title, "advanced", "Haarpflege Advanced")
+    if title == "Haarstyling Advanced":
+        return convert_course_transcripts, (title, "styling-advanced", "Haarstyling Advanced")
+    if title == "Häufige Fragen":
+        return convert_qa, ()
+    if title.startswith("Linksammlung"):
+        return convert_links, (title,)
+    if title.startswith("Produklisten"):
+        return convert_products, ()
+    if title.startswith("Story"):
+        return convert_story, ()
+    return None
+
+
+def convert_docx_section(offset: int, paras: ParagraphTable, memo: dict) -> dict:
+    """Convert one Title section (row 0 of paras), or reuse its memoized outputs.
+
+    Returns the section's memo entry ({key: {"title", "outputs"}}), empty for
+    sections without a handler.
+    """
+    start, end, title = 0, len(paras.texts), paras.texts[0]
+    handler = section_handler(title)
+    if handler is None:
+        if title in ("Call Recordings", "Link Sammlungen") or title.startswith(("Buch", "Ton", "Graphiken")):
+            print(f"  Skipping placeholder section: {title}")
+        else:
+            print(f"  WARNING: Unknown section '{title}' (paras {offset}-{offset + end})")
+        return {}
+
+    convert, args = handler
+    key = section_key(convert, args, paras)
+    outputs = reuse_section(memo.get(key))
+    if outputs is not None:
+        count("sections_reused")
+        print(f"\n  Unchanged section: {title} ({len(outputs)} files reused)")
+        hashes = memo[key]["outputs"]
+    else:
+        outputs = collect_outputs(convert, paras, start, end, *args)
+        hashes = {rel_key(out): file_sha256(staged_path(out)) for out in outputs}
+    for out in outputs:
+        record_output(out)
+    return {key: {"title": title, "outputs": hashes}}
+
+
+# Line kinds assigned by classify_line(). Each paragraph is classified once;
+# the converters below only read the tags.
+LINE_EMPTY = "empty"
+LINE_TIMESTAMP = "timestamp"      # '0:00 text' / '00:00:00 text'
+LINE_MODULE = "module"            # '01 Intro' (course module header, < 80 chars)
+LINE_GREETING = "greeting"        # start of a Q&A message ('Hey ', 'Hallo', ...)
+LINE_LINK_HEADER = "link-header"  # 'Linksammlung Live-Call 10.06.25'
+LINE_URL = "url"
+LINE_TEXT = "text"
+
+LINE_TIMESTAMP_PATTERN = re.compile(r'(\d{1,2}:\d{2}(?::\d{2})?)\s*')
+MODULE_HEADER_PATTERN = re.compile(r'\d{2}\s+(.+)')
+LINK_HEADER_PATTERN = re.compile(r'Linksammlung Live-Call (\d{2}\.\d{2}\.\d{2})')
+QUESTION_GREETINGS = (
+    'Hey ', 'Hey,', 'Hey!', 'Hallo', 'Hi ', 'Hi,', 'Hi!',
+    'SOS', 'Lieber', 'Liebe', 'Moin', 'Guten Tag',
+    'Servus', 'Halloooo', 'Hallöchen', 'Huhu', 'Huhuu',
+)
+
+
+def classify_line(text: str) -> tuple[str, str, int]:
+    """Tag a stripped paragraph: (kind, timestamp, body start).
+
+    The body is text[body_start:]: the text after the timestamp, the module
+    name after its number, the date of a link header, else the whole line.
+    """
+    if not text:
+        return LINE_EMPTY, "", 0
+    match = LINE_TIMESTAMP_PATTERN.match(text)
+    if match:
+        return LINE_TIMESTAMP, match.group(1), match.end()
+    if text.startswith(QUESTION_GREETINGS):
+        return LINE_GREETING, "", 0
+    if text.startswith("http"):
+        return LINE_URL, "", 0
+    match = MODULE_HEADER_PATTERN.fullmatch(text)
+    if match and len(text) < 80:
+        return LINE_MODULE, "", match.start(1)
+    match = LINK_HEADER_PATTERN.fullmatch(text)
+    if match:
+        return LINE_LINK_HEADER, "", match.start(1)
+    return LINE_TEXT, "", 0
 
 
 def convert_course_transcripts(paras, start, end, title, subfolder, course_name):
     """Convert numbered module transcripts (e.g., '01 Intro', '02 Kopfhaut')."""
     print(f"\n  Processing course: {title}")
-    out_dir = MD_DIR / "course-transcripts" / subfolder
+    out_dir = document_dir() / "course-transcripts" / subfolder
 
     # Find module markers: lines like "01 Intro", "02 Kopfhaut", etc.
     modules = []  # (para_idx, module_number, module_name)
     for i in range(start + 1, end):
-        text = paras[i].text.strip()
-        if not text:
-            continue
-        m = re.match(r'^(\d{2})\s+(.+)$', text)
-        if m and not has_timestamp(text) and len(text) < 80:
-            modules.append((i, m.group(1), m.group(2)))
+        if paras.kinds[i] == LINE_MODULE:
+            text = paras.texts[i]
+            modules.append((i, text[:2], text[paras.body_starts[i]:]))
 
     if not modules:
         # Fallback: dump as single file
@@ -181,31 +2055,19 @@ def convert_course_transcripts(paras, start, end, title, subfolder, course_name)
 def convert_basics2(paras, start, end):
     """Convert Haarpflege Basic 2 which uses Heading styles for sub-topics."""
     print(f"\n  Processing course: Haarpflege Basic 2")
-    out_dir = MD_DIR / "course-transcripts" / "basics-2"
-
-    # Find heading-based sub-sections
-    sub_sections = []
-    for i in range(start + 1, end):
-        style = paras[i].style.name
-        text = paras[i].text.strip()
-        if style in ("Heading 1", "Heading 2") and text and not has_timestamp(text):
-            sub_sections.append((i, text))
-
-    if not sub_sections:
-        # All paragraphs are Heading-styled transcript lines
-        # Group by actual topic headings (non-timestamp Heading 2)
-        pass
+    out_dir = document_dir() / "course-transcripts" / "basics-2"
 
     # In this section, Heading 2 = topic titles, Heading 1 = transcript body
     topic_starts = []
     for i in range(start + 1, end):
-        style = paras[i].style.name
-        text = paras[i].text.strip()
-        if not text:
+        kind = paras.kinds[i]
+        if kind in (LINE_EMPTY, LINE_TIMESTAMP):
             continue
-        if style == "Heading 2" and not has_timestamp(text):
+        style = paras.styles[i]
+        text = paras.texts[i]
+        if style == "Heading 2":
             topic_starts.append((i, text))
-        elif style == "Heading 1" and not has_timestamp(text) and len(text) < 80:
+        elif style == "Heading 1" and len(text) < 80:
             topic_starts.append((i, text))
 
     if not topic_starts:
@@ -229,14 +2091,20 @@ def merge_transcript_paragraphs(paras, start, end):
     """Merge timestamped transcript paragraphs into coherent text.
 
     Keeps timestamps as inline markers [MM:SS] at natural breaks.
-    Merges consecutive sentences into paragraphs.
+    Merges consecutive sentences into paragraphs (or into token-budgeted
+    segments with --segment-tokens, see pack_transcript_lines).
     """
+    reduction = new_reduction()
+    if SEGMENT_TOKENS:
+        text = pack_transcript_lines(paras, start, end, SEGMENT_TOKENS, reduction)
+        report_reduction(reduction)
+        return text
     lines = []
     current_paragraph = []
 
     for i in range(start, end):
-        text = paras[i].text.strip()
-        if not text:
+        kind = paras.kinds[i]
+        if kind == LINE_EMPTY:
             # Empty line = paragraph break
             if current_paragraph:
                 lines.append(" ".join(current_paragraph))
@@ -244,28 +2112,61 @@ def merge_transcript_paragraphs(paras, start, end):
                 current_paragraph = []
             continue
 
-        if has_timestamp(text):
-            ts = extract_timestamp(text)
-            body = strip_timestamp(text)
+        if kind == LINE_TIMESTAMP:
+            body = reduce_tracked(paras.texts[i][paras.body_starts[i]:], reduction)
             if body:
-                current_paragraph.append(f"[{ts}] {body}")
+                current_paragraph.append(f"[{paras.timestamps[i]}] {body}")
         else:
-            current_paragraph.append(text)
+            text = reduce_tracked(paras.texts[i], reduction)
+            if text:
+                current_paragraph.append(text)
 
     if current_paragraph:
         lines.append(" ".join(current_paragraph))
 
+    report_reduction(reduction)
     return "\n".join(lines)
 
 
-def is_question_start(text: str) -> bool:
-    """Check if a line looks like the start of a new question/message."""
-    greetings = [
-        'Hey ', 'Hey,', 'Hey!', 'Hallo', 'Hi ', 'Hi,', 'Hi!',
-        'SOS', 'Lieber', 'Liebe', 'Moin', 'Guten Tag',
-        'Servus', 'Halloooo', 'Hallöchen', 'Huhu', 'Huhuu',
-    ]
-    return any(text.startswith(g) for g in greetings)
+def pack_transcript_lines(paras, start, end, budget: tuple[int, int, int], reduction: dict | None = None) -> str:
+    """Merge transcript lines into segments of a (min, target, max) token budget.
+
+    Segments prefer to end at paragraph breaks, then before timestamped lines
+    (see pack_segments). Inside a segment, lines of one paragraph are joined
+    with a space and paragraphs with a newline, so [MM:SS] markers stay where
+    they were and every segment is a single Markdown paragraph.
+    """
+    lines = []
+    strengths = []
+    paragraph_break = True
+    for i in range(start, end):
+        kind = paras.kinds[i]
+        if kind == LINE_EMPTY:
+            paragraph_break = True
+            continue
+        if kind == LINE_TIMESTAMP:
+            body = reduce_tracked(paras.texts[i][paras.body_starts[i]:], reduction)
+            if not body:
+                continue
+            lines.append(f"[{paras.timestamps[i]}] {body}")
+            strengths.append(BREAK_STRONG if paragraph_break else BREAK_TIMESTAMP)
+        else:
+            text = reduce_tracked(paras.texts[i], reduction)
+            if not text:
+                continue
+            lines.append(text)
+            strengths.append(BREAK_STRONG if paragraph_break else BREAK_WEAK)
+        paragraph_break = False
+
+    costs = [len(line) for line in lines]
+    segments = []
+    for seg_start, seg_end in pack_segments(costs, [cost + 1 for cost in costs], strengths, budget):
+        parts = [lines[seg_start]]
+        for i in range(seg_start + 1, seg_end):
+            parts.append("\n" if strengths[i] == BREAK_STRONG else " ")
+            parts.append(lines[i])
+        segments.append("".join(parts))
+    return "\n\n".join(segments)
 
 
 def convert_qa(paras, start, end):
@@ -275,21 +2176,22 @@ def convert_qa(paras, start, end):
     boundaries, since empty-line spacing is inconsistent.
     """
     print(f"\n  Processing: Häufige Fragen")
-    out_path = MD_DIR / "qa" / "haeufige-fragen.md"
+    out_path = document_dir() / "qa" / "haeufige-fragen.md"
 
     questions = []
     current_q = []
     prev_was_empty = False
 
     for i in range(start + 1, end):
-        text = paras[i].text.strip()
+        kind = paras.kinds[i]
 
-        if not text:
+        if kind == LINE_EMPTY:
             prev_was_empty = True
             continue
 
         # New question boundary: greeting after empty line(s)
-        if prev_was_empty and is_question_start(text) and current_q:
+        text = paras.texts[i]
+        if prev_was_empty and kind == LINE_GREETING and current_q:
             questions.append("\n".join(current_q))
             current_q = []
 
@@ -313,6 +2215,7 @@ def convert_qa(paras, start, end):
         "speaker": "Community + advisor",
         "language": "de",
     }, f"# Häufige Fragen\n\n" + "\n\n---\n\n".join(content_parts))
+    count("questions", len(questions))
     print(f"    ({len(questions)} questions extracted)")
 
 
@@ -328,18 +2231,18 @@ def convert_links(paras, start, end, title):
         filename = f"{slugify(title)}.md"
 
     print(f"\n  Processing: {title}")
-    out_path = MD_DIR / "live-call-links" / filename
+    out_path = document_dir() / "live-call-links" / filename
 
     lines = []
     for i in range(start + 1, end):
-        text = paras[i].text.strip()
-        if not text:
+        kind = paras.kinds[i]
+        text = paras.texts[i]
+        if kind == LINE_EMPTY:
             lines.append("")
             continue
 
-        # Check if this is a sub-collection header within the section
-        sub_match = re.match(r'^Linksammlung Live-Call (\d{2}\.\d{2}\.\d{2})$', text)
-        if sub_match:
+        # Sub-collection header within the section
+        if kind == LINE_LINK_HEADER:
             # Flush current to file and start new one
             if lines:
                 content = "\n".join(lines)
@@ -350,16 +2253,16 @@ def convert_links(paras, start, end, title):
                 }, f"# {title}\n\n{content}")
 
             # Start new sub-file
-            d, m, y = sub_match.group(1).split(".")
+            d, m, y = text[paras.body_starts[i]:].split(".")
             date_str = f"2025-{m}-{d}"
             filename = f"links-{date_str}.md"
-            out_path = MD_DIR / "live-call-links" / filename
+            out_path = document_dir() / "live-call-links" / filename
             title = text
             lines = []
             continue
 
         # Format URLs as clickable links
-        if text.startswith("http"):
+        if kind == LINE_URL:
             lines.append(f"- <{text}>")
         else:
             lines.append(text)
@@ -376,11 +2279,11 @@ def convert_links(paras, start, end, title):
 def convert_products(paras, start, end):
     """Convert product lists section."""
     print(f"\n  Processing: Produktlisten")
-    out_path = MD_DIR / "products" / "produktlisten.md"
+    out_path = document_dir() / "products" / "produktlisten.md"
 
     lines = []
     for i in range(start + 1, end):
-        text = paras[i].text.strip()
+        text = paras.texts[i]
         if text:
             lines.append(f"- {text}")
 
@@ -394,7 +2297,7 @@ def convert_products(paras, start, end):
 def convert_story(paras, start, end):
     """Convert story section (timestamped narrative transcript)."""
     print(f"\n  Processing: Story")
-    out_path = MD_DIR / "stories" / "story-guide.md"
+    out_path = document_dir() / "stories" / "story-guide.md"
 
     content = merge_transcript_paragraphs(paras, start + 1, end)
 
@@ -410,90 +2313,114 @@ def convert_story(paras, start, end):
 # 2. PDF CONVERSION
 # ---------------------------------------------------------------------------
 
-def parse_pdf():
-    """Extract book text and split into per-chapter Markdown files."""
-    print("\n\n=== STEP 2: Converting Book PDF ===")
-    out_dir = MD_DIR / "book"
+def parse_pdf(run: dict | None = None, jobs: int = 1):
+    """Convert the book PDF unless the manifest shows it unchanged."""
+    run_stages(run, ["pdf"], jobs)
+
+
+def pdf_units() -> tuple[list[str], list[tuple]]:
+    """Stage 2 work: the book PDF is a single unit; in corpus mode, one unit per PDF."""
+    if CORPUS_ROOTS:
+        documents = corpus_documents(".pdf")
+        notes = [f"  Found {len(documents)} PDF documents in corpus"]
+        return notes, [(path, convert_document, (namespace, convert_book_pdf, path))
+                       for path, namespace in documents]
+    path = pdf_path()
+    return [], [(path, convert_book_pdf, (path,))]
+
+
+# Chapter metadata for semantic topic descriptions
+BOOK_CHAPTER_TOPICS = {
+    1: "Hintergrund und Werdegang des Autors",
+    2: "Schönheitsideale und gesellschaftlicher Druck",
+    3: "Aktuelle Haartrends und Moden",
+    4: "Die Friseurbranche und Salonkultur",
+    5: "Haarindustrie und Produktentwicklung",
+    6: "Haarbiologie und Haarstruktur",
+    7: "Kopfhaut-Gesundheit und Pflege",
+    8: "Haarwachstum und Haarausfall",
+    9: "Haartypen und Texturen",
+    10: "Inhaltsstoffe und Haarchemie",
+    11: "Haarpflege-Techniken und Methoden",
+    12: "Locken und Wellen",
+    13: "Haarbindungen und Reparatur",
+    14: "Haarstyling-Grundlagen",
+    15: "Tägliche Haarroutine",
+    16: "Zusammenfassung und Fazit",
+}
 
-    result = subprocess.run(
-        ["pdftotext", "-layout", str(PDF_PATH), "-"],
-        capture_output=True, text=True
-    )
-    text = result.stdout
-
-    # Chapter metadata for semantic topic descriptions
-    chapter_topics = {
-        1: "Hintergrund und Werdegang des Autors",
-        2: "Schönheitsideale und gesellschaftlicher Druck",
-        3: "Aktuelle Haartrends und Moden",
-        4: "Die Friseurbranche und Salonkultur",
-        5: "Haarindustrie und Produktentwicklung",
-        6: "Haarbiologie und Haarstruktur",
-        7: "Kopfhaut-Gesundheit und Pflege",
-        8: "Haarwachstum und Haarausfall",
-        9: "Haartypen und Texturen",
-        10: "Inhaltsstoffe und Haarchemie",
-        11: "Haarpflege-Techniken und Methoden",
-        12: "Locken und Wellen",
-        13: "Haarbindungen und Reparatur",
-        14: "Haarstyling-Grundlagen",
-        15: "Tägliche Haarroutine",
-        16: "Zusammenfassung und Fazit",
-    }
+# Split by KAPITEL markers
+# pdftotext inserts \x0c (form feed) at page breaks, so strip those
+# Pattern: "KAPITEL N" on its own line (all caps = actual chapter start)
+BOOK_CHAPTER_PATTERN = re.compile(r'^\x0c*KAPITEL\s+(\d+)\s*$', re.MULTILINE)
+BOOK_AUTHOR_PATTERN = re.compile(r'ÜBER DEN AUTOR\s*\n(.+)', re.DOTALL)
+# Line-at-a-time forms of the two markers, for locate_book_pages().
+BOOK_CHAPTER_LINE = re.compile(r'KAPITEL\s+(\d+)\s*')
+BOOK_AUTHOR_LINE = re.compile(r'ÜBER DEN AUTOR\s*$')
 
-    # Split by KAPITEL markers
-    # pdftotext inserts \x0c (form feed) at page breaks, so strip those
-    # Pattern: "KAPITEL N" on its own line (all caps = actual chapter start)
-    chapter_pattern = re.compile(r'^\x0c*KAPITEL\s+(\d+)\s*$', re.MULTILINE)
-    splits = list(chapter_pattern.finditer(text))
+
+def convert_book_pdf(source_path: Path):
+    """Extract book text and split into per-chapter Markdown files."""
+    out_dir = document_dir() / "book"
+    if PDF_EXTRACT == "pages":
+        convert_book_pdf_pages(source_path, out_dir)
+        return
+
+    text = extract_pdf_text(source_path)
+    splits = list(BOOK_CHAPTER_PATTERN.finditer(text))
 
     if not splits:
         print("  WARNING: No chapter markers found in PDF!")
         return
 
     for idx, match in enumerate(splits):
-        chapter_num = int(match.group(1))
-        chapter_start = match.end()
         chapter_end = splits[idx + 1].start() if idx + 1 < len(splits) else len(text)
+        write_book_chapter(out_dir, int(match.group(1)), text[match.end():chapter_end].strip())
 
-        raw_chapter = text[chapter_start:chapter_end].strip()
+    # Also extract the "ÜBER DEN AUTOR" section if present
+    write_book_author(out_dir, text.replace('\x0c', ''))
 
-        # Extract chapter title (usually ALL CAPS on the next non-empty lines)
-        lines = raw_chapter.split('\n')
-        title_lines = []
-        body_start = 0
-        for li, line in enumerate(lines):
-            stripped = line.strip()
-            if not stripped:
-                continue
-            # Chapter titles are ALL CAPS
-            if stripped.isupper() and len(stripped) > 3:
-                title_lines.append(stripped)
-                body_start = li + 1
-            else:
-                break
 
-        chapter_title = " ".join(title_lines) if title_lines else f"Kapitel {chapter_num}"
-        body_lines = lines[body_start:]
+def write_book_chapter(out_dir: Path, chapter_num: int, raw_chapter: str):
+    """Render one chapter's raw pdftotext text as Markdown."""
+    # Extract chapter title (usually ALL CAPS on the next non-empty lines)
+    lines = raw_chapter.split('\n')
+    title_lines = []
+    body_start = 0
+    for li, line in enumerate(lines):
+        stripped = line.strip()
+        if not stripped:
+            continue
+        # Chapter titles are ALL CAPS
+        if stripped.isupper() and len(stripped) > 3:
+            title_lines.append(stripped)
+            body_start = li + 1
+        else:
+            break
 
-        # Clean up body text
-        cleaned = clean_pdf_text(body_lines)
+    chapter_title = " ".join(title_lines) if title_lines else f"Kapitel {chapter_num}"
+    body_lines = lines[body_start:]
 
-        topic = chapter_topics.get(chapter_num, "")
-        filename = f"kapitel-{chapter_num:02d}-{slugify(chapter_title)}.md"
+    # Clean up body text
+    cleaned = clean_pdf_text(body_lines)
 
-        write_md(out_dir / filename, {
-            "source_type": "book",
-            "book": "Interne Haarpflege-Referenz",
-            "chapter": str(chapter_num),
-            "chapter_title": chapter_title.title(),
-            "topic": topic,
-            "speaker": "advisor",
-            "language": "de",
-        }, f"# Kapitel {chapter_num}: {chapter_title.title()}\n\n{cleaned}")
+    topic = BOOK_CHAPTER_TOPICS.get(chapter_num, "")
+    filename = f"kapitel-{chapter_num:02d}-{slugify(chapter_title)}.md"
 
-    # Also extract the "ÜBER DEN AUTOR" section if present
-    author_match = re.search(r'ÜBER DEN AUTOR\s*\n(.+)', text.replace('\x0c', ''), re.DOTALL)
+    write_md(out_dir / filename, {
+        "source_type": "book",
+        "book": "Interne Haarpflege-Referenz",
+        "chapter": str(chapter_num),
+        "chapter_title": chapter_title.title(),
+        "topic": topic,
+        "speaker": "advisor",
+        "language": "de",
+    }, f"# Kapitel {chapter_num}: {chapter_title.title()}\n\n{cleaned}")
+
+
+def write_book_author(out_dir: Path, text: str):
+    """Render the "ÜBER DEN AUTOR" section (form feeds already removed), if present."""
+    author_match = BOOK_AUTHOR_PATTERN.search(text)
     if author_match:
         author_text = clean_pdf_text(author_match.group(1).strip().split('\n'))
         write_md(out_dir / "ueber-den-autor.md", {
@@ -505,122 +2432,411 @@ def parse_pdf():
         }, f"# Über den Autor\n\n{author_text}")
 
 
+# Page-range extraction (--pdf-extract pages): a page map records the page of
+# every chapter marker and of "ÜBER DEN AUTOR". It is cached per source hash;
+# on a miss it is read from the cached whole-book text if there is one, else
+# from one streaming pdftotext pass over the whole book (never held in
+# memory), so a new PDF costs one full pass plus the page ranges. Chapters
+# are then extracted concurrently with page-bounded pdftotext calls (-f/-l,
+# each with a timeout) and written in order as they complete, so a long book
+# takes about as long as its slowest chapter and memory is bounded by the
+# chapters in flight. A page-range extract is an exact slice of the whole-book
+# output, so the Markdown is identical to the default mode.
+
+def locate_book_pages(source_path: Path) -> dict:
+    """Page map of a book: {"chapters": [[number, page, ordinal on page], ...], "author_page"}."""
+    path = cache_path(source_path, " ".join(PDFTOTEXT_ARGS) + " page-map", ".json")
+    if path is not None and path.exists():
+        count("extract_cache_hits")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    whole = cache_path(source_path, " ".join(PDFTOTEXT_ARGS), ".txt")
+    if whole is not None and whole.exists():
+        count("extract_cache_hits")
+        with whole.open(encoding="utf-8") as f:
+            page_map = scan_book_pages(f)
+    else:
+        cmd = [*PDFTOTEXT_ARGS, str(source_path), "-"]
+        expired = threading.Event()
+        with subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True) as proc:
+            # PDF_TIMEOUT bounds the read too: killing a hung pdftotext
+            # closes its stdout and ends the scan.
+            deadline = threading.Timer(PDF_TIMEOUT, lambda: (expired.set(), proc.kill()))
+            deadline.start()
+            try:
+                page_map = scan_book_pages(proc.stdout)
+                proc.wait()
+            finally:
+                deadline.cancel()
+        if expired.is_set():
+            raise subprocess.TimeoutExpired(cmd, PDF_TIMEOUT)
+        if proc.returncode != 0:
+            raise RuntimeError(f"pdftotext failed on {source_path.name} (exit {proc.returncode})")
+    if path is not None:
+        write_cache(path, json.dumps(page_map).encode("utf-8"))
+    return page_map
+
+
+def scan_book_pages(lines: Iterable[str]) -> dict:
+    """Page map (see locate_book_pages) of whole-book pdftotext output, line by line."""
+    chapters = []
+    author_page = None
+    page = 1
+    for line in lines:
+        body = line.lstrip("\x0c")
+        page += len(line) - len(body)
+        match = BOOK_CHAPTER_LINE.fullmatch(body)
+        if match:
+            ordinal = sum(1 for _, chapter_page, _ in chapters if chapter_page == page)
+            chapters.append([int(match.group(1)), page, ordinal])
+        if author_page is None and BOOK_AUTHOR_LINE.search(body):
+            author_page = page
+        page += body.count("\x0c")
+    return {"chapters": chapters, "author_page": author_page}
+
+
+def extract_pdf_pages(source_path: Path, first: int, last: int | None) -> str:
+    """pdftotext output for pages first..last (None = to the end), bounded by PDF_TIMEOUT."""
+    page_args = ["-f", str(first)] + (["-l", str(last)] if last is not None else [])
+    result = subprocess.run(
+        [*PDFTOTEXT_ARGS, *page_args, str(source_path), "-"],
+        capture_output=True, text=True, timeout=PDF_TIMEOUT,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"pdftotext failed on pages {first}-{last or 'end'} of {source_path.name}: "
+                           f"{result.stderr.strip()}")
+    return result.stdout
+
+
+def extract_book_chapter(source_path: Path, chapters: list, idx: int) -> str:
+    """Raw text of chapter idx, from the pages between its marker and the next one.
+
+    If the markers in the page range do not match the page map, the chapter
+    is cut from the whole-book text instead.
+    """
+    chapter_num, first, ordinal = chapters[idx]
+    last = chapters[idx + 1][1] if idx + 1 < len(chapters) else None
+    text = extract_pdf_pages(source_path, first, last)
+    splits = list(BOOK_CHAPTER_PATTERN.finditer(text))
+    found = [int(match.group(1)) for match in splits[ordinal:ordinal + 2]]
+    expected = [chapter_num] if last is None else [chapter_num, chapters[idx + 1][0]]
+    if found[:len(expected)] != expected:
+        count("pdf_page_fallbacks")
+        return book_chapter_from_text(source_path, chapters, idx)
+    chapter_end = splits[ordinal + 1].start() if last is not None else len(text)
+    return text[splits[ordinal].end():chapter_end].strip()
+
+
+def book_chapter_from_text(source_path: Path, chapters: list, idx: int) -> str:
+    """Raw text of chapter idx cut from the whole-book pdftotext output (as --pdf-extract whole does)."""
+    text = extract_pdf_text(source_path)
+    splits = list(BOOK_CHAPTER_PATTERN.finditer(text))
+    if len(splits) != len(chapters) or int(splits[idx].group(1)) != chapters[idx][0]:
+        raise RuntimeError(f"KAPITEL {chapters[idx][0]} not found in {source_path.name}")
+    chapter_end = splits[idx + 1].start() if idx + 1 < len(splits) else len(text)
+    return text[splits[idx].end():chapter_end].strip()
+
+
+def convert_book_pdf_pages(source_path: Path, out_dir: Path):
+    """convert_book_pdf via concurrent page-range extraction."""
+    page_map = locate_book_pages(source_path)
+    chapters = page_map["chapters"]
+    if not chapters:
+        print("  WARNING: No chapter markers found in PDF!")
+        return
+
+    with ThreadPoolExecutor(max_workers=PDF_WORKERS) as pool:
+        futures = [pool.submit(extract_book_chapter, source_path, chapters, idx) for idx in range(len(chapters))]
+        author = None
+        if page_map["author_page"] is not None:
+            author = pool.submit(extract_pdf_pages, source_path, page_map["author_page"], None)
+        try:
+            for (chapter_num, _, _), future in zip(chapters, futures):
+                write_book_chapter(out_dir, chapter_num, future.result())
+            if author is not None:
+                write_book_author(out_dir, author.result().replace('\x0c', ''))
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+PAGE_NUMBER_LINE = re.compile(r'\d{1,3}')
+
+
 def clean_pdf_text(lines: list[str]) -> str:
     """Clean up PDF-extracted text: fix hyphenation, remove page numbers, etc."""
-    cleaned = []
+    return "\n\n".join(iter_pdf_paragraphs(lines))
+
+
+def iter_pdf_paragraphs(lines) -> Iterator[str]:
+    """Yield cleaned paragraphs from pdftotext lines in a single forward pass.
+
+    Standalone page numbers are dropped, blank lines end a paragraph, a line
+    ending in '-' is joined to the next line without the hyphen
+    ("auseinander-" + "setzen" -> "auseinandersetzen"), other lines are
+    joined with a space, and runs of spaces are collapsed.
+    """
+    pieces: list[str] = []
+    hyphen = False  # last piece ends in a '-' that joins the next line
     for line in lines:
         stripped = line.strip().strip('\x0c').strip()
 
         # Skip standalone page numbers
-        if re.match(r'^\d{1,3}$', stripped):
+        if PAGE_NUMBER_LINE.fullmatch(stripped):
             continue
 
-        # Skip empty lines (but preserve paragraph breaks)
+        # Empty line = paragraph break
         if not stripped:
-            if cleaned and cleaned[-1] != "":
-                cleaned.append("")
+            if pieces:
+                yield squash_spaces(" ".join(pieces))
+                pieces = []
+                hyphen = False
             continue
 
-        cleaned.append(stripped)
+        if hyphen:
+            pieces[-1] = pieces[-1][:-1] + stripped
+            # The first character was consumed by the join; a lone '-' cannot join again.
+            hyphen = len(stripped) > 1 and stripped.endswith('-')
+        else:
+            pieces.append(stripped)
+            hyphen = stripped.endswith('-')
+
+    if pieces:
+        yield squash_spaces(" ".join(pieces))
 
-    # Join lines, fixing hyphenation at line breaks
-    text = "\n".join(cleaned)
-    # Fix word breaks: "auseinander-\nsetzen" -> "auseinandersetzen"
-    text = re.sub(r'-\n(\S)', r'\1', text)
-    # Join lines that are part of the same paragraph (no double newline)
-    # A single newline within text = continuation of paragraph
-    paragraphs = text.split('\n\n')
-    result = []
-    for para in paragraphs:
-        # Join single-newline breaks within a paragraph
-        joined = para.replace('\n', ' ')
-        # Clean up multiple spaces
-        joined = re.sub(r' +', ' ', joined)
-        result.append(joined.strip())
 
-    return "\n\n".join(result)
+def _assert_pdf_paragraphs_smoke():
+    # A word hyphenated across a page break: the page number is dropped and the
+    # form feed that starts the next page does not stop the join.
+    lines = ["Wir müssen uns damit auseinander-", "  42", "\x0csetzen, und zwar", "gründlich.", "", "Neuer  Absatz."]
+    assert list(iter_pdf_paragraphs(lines)) == ["Wir müssen uns damit auseinandersetzen, und zwar gründlich.", "Neuer Absatz."]
+    assert list(iter_pdf_paragraphs(["Ende der Seite.", "\x0c17", "Nächste Seite"])) == ["Ende der Seite. Nächste Seite"]
+    assert list(iter_pdf_paragraphs(["Kopfhaut-", "\x0c", "pflege"])) == ["Kopfhaut-", "pflege"]  # blank page line breaks
+    assert list(iter_pdf_paragraphs(["Haar-", "-", "Pflege"])) == ["Haar- Pflege"]  # a lone '-' joins only once
+    assert clean_pdf_text(["Ein Satz-", "\x0cteil.", "", "", "Zwei."]) == "Ein Satzteil.\n\nZwei."
 
 
 # ---------------------------------------------------------------------------
 # 3. VTT CONVERSION
 # ---------------------------------------------------------------------------
 
-def parse_vtt_files():
+def parse_vtt_files(run: dict | None = None, jobs: int = 1):
     """Convert all VTT files into merged Markdown files."""
-    print("\n\n=== STEP 3: Converting VTT files ===")
+    run_stages(run, ["vtt"], jobs)
+
+
+def vtt_units() -> tuple[list[str], list[tuple]]:
+    """Stage 3 work: one unit per VTT file."""
     out_dir = MD_DIR / "live-calls"
+    vtt_files = sorted(VTT_DIR.glob("*.vtt"))
+    notes = [f"  Found {len(vtt_files)} VTT files"]
+    return notes, [(vtt_path, convert_single_vtt, (vtt_path, out_dir)) for vtt_path in vtt_files]
 
-    vtt_files = sorted(DATA_DIR.glob("*.vtt"))
-    print(f"  Found {len(vtt_files)} VTT files")
 
-    for vtt_path in vtt_files:
-        convert_single_vtt(vtt_path, out_dir)
+VTT_CUE_TIMING = re.compile(r'\d{2}:\d{2}:\d{2}\.\d{3}\s*-->')
+VTT_TIMESTAMPS = re.compile(r'(\d{2}):(\d{2}):(\d{2})\.(\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2})\.(\d{3})')
+VTT_SPEAKER = re.compile(r'([^:]{2,40}):\s*(.+)')
+NO_SPEAKER = -1
 
 
-def parse_vtt_cues(text: str) -> list[dict]:
-    """Parse a VTT file into a list of cue dicts."""
-    cues = []
-    # Split by double newline to get individual cues
-    blocks = re.split(r'\n\n+', text)
+class CueTable(NamedTuple):
+    """VTT cues as columns.
 
-    for block in blocks:
-        block = block.strip()
-        if not block or block == "WEBVTT":
-            continue
+    starts/ends are milliseconds, speakers index into names (NO_SPEAKER for
+    none; names in first-seen order), and cue i's text is
+    text[offsets[i]:offsets[i + 1] - 1] -- texts are joined by single spaces,
+    so a run of cues is one slice. next_change[i] is the first later cue
+    whose speaker differs from cue i's, not counting cues without a speaker
+    (len(starts) if none); monotonic is True when starts never decrease.
+    """
+    starts: array
+    ends: array
+    speakers: array
+    names: list[str]
+    text: str
+    offsets: array
+    next_change: array
+    monotonic: bool
 
-        lines = block.split('\n')
 
-        # Find the timestamp line
-        ts_line = None
-        text_lines = []
-        for line in lines:
-            if re.match(r'\d{2}:\d{2}:\d{2}\.\d{3}\s*-->', line):
-                ts_line = line
-            elif ts_line is not None:
-                text_lines.append(line)
-            # Skip cue number lines (just digits)
+def parse_vtt_cues(text: str) -> CueTable:
+    """Parse VTT text into a CueTable (see iter_vtt_cues)."""
+    return build_cue_table(iter_vtt_cues(text.split('\n')))
 
-        if not ts_line or not text_lines:
-            continue
 
-        # Parse timestamps
-        ts_match = re.match(
-            r'(\d{2}:\d{2}:\d{2})\.\d{3}\s*-->\s*(\d{2}:\d{2}:\d{2})\.\d{3}',
-            ts_line
-        )
-        if not ts_match:
+def iter_vtt_cues(lines: Iterable[str]) -> Iterator[dict]:
+    """Yield cue dicts from VTT lines (e.g. an open file) one block at a time.
+
+    Blocks are separated by empty lines; only the current block is held in
+    memory, so a multi-hour recording parses in constant space.
+    """
+    block = []
+    for line in itertools.chain(lines, [""]):
+        line = line.rstrip('\n')
+        if line:
+            block.append(line)
             continue
+        if block:
+            cue = parse_vtt_block("\n".join(block).strip())
+            block = []
+            if cue is not None:
+                yield cue
+
+
+def parse_vtt_block(block: str) -> dict | None:
+    """Parse one cue block into {"start_ms", "end_ms", "speaker", "text"}, or None."""
+    if not block or block == "WEBVTT":
+        return None
+
+    # Find the timestamp line; text follows it (cue number lines before it are skipped)
+    ts_line = None
+    text_lines = []
+    for line in block.split('\n'):
+        if VTT_CUE_TIMING.match(line):
+            ts_line = line
+        elif ts_line is not None:
+            text_lines.append(line)
+
+    if not ts_line or not text_lines:
+        return None
+
+    ts_match = VTT_TIMESTAMPS.match(ts_line)
+    if not ts_match:
+        return None
+    h1, m1, s1, ms1, h2, m2, s2, ms2 = map(int, ts_match.groups())
+
+    full_text = " ".join(text_lines)
+
+    # Extract speaker if present (format: "Speaker Name: text")
+    speaker = None
+    speech = full_text
+    speaker_match = VTT_SPEAKER.fullmatch(full_text)
+    if speaker_match:
+        potential_speaker = speaker_match.group(1)
+        # Verify it looks like a name (not a timestamp or URL)
+        if not potential_speaker[0].isdecimal() and 'http' not in potential_speaker:
+            speaker = potential_speaker
+            speech = speaker_match.group(2)
+
+    return {
+        "start_ms": ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1,
+        "end_ms": ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2,
+        "speaker": speaker,
+        "text": speech,
+    }
 
-        start_ts = ts_match.group(1)
-        end_ts = ts_match.group(2)
-
-        full_text = " ".join(text_lines)
-
-        # Extract speaker if present (format: "Speaker Name: text")
-        speaker = None
-        speech = full_text
-        speaker_match = re.match(r'^([^:]{2,40}):\s*(.+)$', full_text)
-        if speaker_match:
-            potential_speaker = speaker_match.group(1)
-            # Verify it looks like a name (not a timestamp or URL)
-            if not re.match(r'^\d', potential_speaker) and 'http' not in potential_speaker:
-                speaker = potential_speaker
-                speech = speaker_match.group(2)
-
-        cues.append({
-            "start": start_ts,
-            "end": end_ts,
-            "speaker": speaker,
-            "text": speech,
-        })
 
-    return cues
+def build_cue_table(cues: Iterable[dict]) -> CueTable:
+    """Pack cue dicts (consumed one at a time) into a CueTable."""
+    starts, ends, speakers, offsets = array('q'), array('q'), array('i'), array('q', [0])
+    speaker_ids: dict[str, int] = {}
+    text = io.StringIO()
+    length = 0
+    monotonic = True
+    for cue in cues:
+        if starts and cue["start_ms"] < starts[-1]:
+            monotonic = False
+        starts.append(cue["start_ms"])
+        ends.append(cue["end_ms"])
+        speaker = cue["speaker"]
+        speakers.append(NO_SPEAKER if speaker is None else speaker_ids.setdefault(speaker, len(speaker_ids)))
+        text.write(cue["text"])
+        text.write(" ")
+        length += len(cue["text"]) + 1
+        offsets.append(length)
+
+    # One backward pass: the next named cue, and past it the next change of speaker
+    n = len(starts)
+    next_change = array('q', bytes(8 * n))
+    next_named = n
+    for i in range(n - 1, -1, -1):
+        speaker = speakers[i]
+        if speaker == NO_SPEAKER or next_named == n or speakers[next_named] != speaker:
+            next_change[i] = next_named
+        else:
+            next_change[i] = next_change[next_named]
+        if speaker != NO_SPEAKER:
+            next_named = i
+    return CueTable(starts, ends, speakers, list(speaker_ids), text.getvalue(), offsets, next_change, monotonic)
+
 
+def reduce_vtt_cues(cues: Iterable[dict], reduction: dict) -> Iterator[dict]:
+    """Reduce each cue's speech and drop cues that carry nothing.
 
-def ts_to_seconds(ts: str) -> int:
-    """Convert HH:MM:SS to seconds."""
-    parts = ts.split(':')
-    return int(parts[0]) * 3600 + int(parts[1]) * 60 + int(parts[2])
+    A cue is dropped when its speech is only fillers, or when it is a
+    backchannel ("Ja.", "Genau, genau.") from another speaker between two
+    cues of the same speaker, whose turn then stays one segment. A micro-cue
+    ("Genau so.") right after a cue of the same speaker is appended to it.
+    """
+    last_speaker = None
+    kept = None  # last kept cue, yielded once the next cue is settled
+    held = None  # backchannel waiting to see whose cue comes next
+    for cue in cues:
+        text = reduce_tracked(cue["text"], reduction)
+        if not text:
+            continue
+        cue = {**cue, "text": text}
+        if held is not None:
+            if cue["speaker"] == last_speaker:
+                reduction["chars_out"] -= len(held["text"])
+            else:
+                if kept is not None:
+                    yield kept
+                kept = held
+                last_speaker = held["speaker"]
+            held = None
+        words = WORD.findall(text.lower())
+        if (cue["speaker"] and last_speaker and cue["speaker"] != last_speaker
+                and len(words) <= BACKCHANNEL_MAX_WORDS and BACKCHANNEL_WORDS.issuperset(words)):
+            held = cue
+            continue
+        if (kept is not None and len(words) <= MICRO_CUE_WORDS and cue["speaker"] == kept["speaker"]
+                and cue["start_ms"] - kept["end_ms"] <= MICRO_CUE_GAP_MS):
+            kept = {**kept, "text": f"{kept['text']} {text}", "end_ms": max(kept["end_ms"], cue["end_ms"])}
+            continue
+        if kept is not None:
+            yield kept
+        kept = cue
+        if cue["speaker"]:
+            last_speaker = cue["speaker"]
+    if kept is not None:
+        yield kept
+    if held is not None:
+        yield held
+
+
+def _assert_transcript_reduction_smoke():
+    assert reduce_speech("Der Hmmm-Effekt ist bekannt.") == "Der Hmmm-Effekt ist bekannt."
+    assert reduce_speech("Das ist ähm gut.") == "Das ist gut."
+    # After a hesitation only hesitations go; the words that follow stay.
+    assert reduce_speech("Hm, genau das ist es.") == "Genau das ist es."
+    assert reduce_speech("Das ist, ähm, eigentlich klar.") == "Das ist, eigentlich klar."
+    # Removals at a sentence start capitalise what is left.
+    assert reduce_speech("Ja, okay. Hm, genau das ist es.") == "Okay. Genau das ist es."
+    assert reduce_speech("Also, wir fangen an.") == "Wir fangen an."
+    assert reduce_speech("Hm, also, wir fangen an.") == "Wir fangen an."
+    assert reduce_speech("Wir sind, also, fertig.") == "Wir sind fertig."
+    # A cue may continue the previous one's sentence: keep its case.
+    assert reduce_speech("ähm also heute") == "also heute"
+    # Numbers and doubled intensifiers are not stutters.
+    assert reduce_speech("Zähl mit: 1 1 2 3.") == "Zähl mit: 1 1 2 3."
+    assert reduce_speech("Das ist sehr sehr wichtig.") == "Das ist sehr sehr wichtig."
+    assert reduce_speech("ich ich ich glaube schon") == "ich glaube schon"
+    assert reduce_speech("Das liegt in der in der Kopfhaut.") == "Das liegt in der Kopfhaut."
+    assert reduce_transcript_text("Ähm, [01:02] Hm, das war's.") == "[01:02] Das war's."
+
+    def cue(start, speaker, text):
+        return {"start_ms": start, "end_ms": start + 900, "speaker": speaker, "text": text}
+
+    cues = [cue(0, "A", "Das ist der erste Punkt."), cue(1000, "B", "Ja."),
+            cue(2000, "A", "Und der zweite Punkt."), cue(3000, "A", "Genau so."),
+            cue(9000, "A", "Richtig."), cue(10000, "B", "Ähm.")]
+    reduced = list(reduce_vtt_cues(cues, {"chars_in": 0, "chars_out": 0}))
+    assert [(c["start_ms"], c["end_ms"], c["text"]) for c in reduced] == [
+        (0, 900, "Das ist der erste Punkt."),
+        (2000, 3900, "Und der zweite Punkt. Genau so."),
+        (9000, 9900, "Richtig."),
+    ]
 
 
 def seconds_to_mmss(secs: int) -> str:
@@ -628,49 +2844,165 @@ def seconds_to_mmss(secs: int) -> str:
     return f"{secs // 60}:{secs % 60:02d}"
 
 
-def merge_vtt_cues(cues: list[dict], window_seconds: int = 90) -> str:
+def vtt_segment_bounds(cues: CueTable, window_seconds: int = 90) -> Iterator[tuple[int, int]]:
+    """Yield [start, end) cue ranges of the merged segments.
+
+    A segment ends at the next change of speaker (cues without a speaker
+    continue the current one) or at the first cue starting window_seconds
+    (whole seconds) after the segment's first cue. Both are lookups --
+    next_change and a binary search over starts -- so the cost is per
+    segment, not per cue.
+    """
+    starts, n = cues.starts, len(cues.starts)
+    start = 0
+    while start < n:
+        end = cues.next_change[start]
+        limit = (starts[start] // 1000 + window_seconds) * 1000
+        if cues.monotonic:
+            end = min(end, bisect.bisect_left(starts, limit, start + 1, end))
+        else:
+            end = next((i for i in range(start + 1, end) if starts[i] >= limit), end)
+        yield start, end
+        start = end
+
+
+def merge_vtt_cues(cues: CueTable, window_seconds: int = 90) -> str:
     """Merge VTT cues into coherent paragraphs grouped by time windows.
 
     Groups cues into ~90-second windows, preserving speaker changes as
     paragraph breaks.
     """
-    if not cues:
-        return ""
-
     segments = []
-    current_segment = []
-    current_speaker = cues[0].get("speaker")
-    segment_start_ts = cues[0]["start"]
-    segment_start_secs = ts_to_seconds(segment_start_ts)
-
-    for cue in cues:
-        cue_secs = ts_to_seconds(cue["start"])
-        cue_speaker = cue.get("speaker")
-        elapsed = cue_secs - segment_start_secs
-
-        # Break on speaker change or time window exceeded
-        if (cue_speaker != current_speaker and cue_speaker is not None) or \
-           elapsed >= window_seconds:
-            if current_segment:
-                ts_label = seconds_to_mmss(segment_start_secs)
-                speaker_label = f"**{current_speaker}:** " if current_speaker else ""
-                text = " ".join(current_segment)
-                segments.append(f"[{ts_label}] {speaker_label}{text}")
-
-            current_segment = []
-            current_speaker = cue_speaker
-            segment_start_ts = cue["start"]
-            segment_start_secs = cue_secs
-
-        current_segment.append(cue["text"])
-
-    # Flush last segment
-    if current_segment:
-        ts_label = seconds_to_mmss(segment_start_secs)
-        speaker_label = f"**{current_speaker}:** " if current_speaker else ""
-        text = " ".join(current_segment)
+    for start, end in vtt_segment_bounds(cues, window_seconds):
+        ts_label = seconds_to_mmss(cues.starts[start] // 1000)
+        speaker = cues.speakers[start]
+        speaker_label = f"**{cues.names[speaker]}:** " if speaker != NO_SPEAKER else ""
+        text = cues.text[cues.offsets[start]:cues.offsets[end] - 1]
         segments.append(f"[{ts_label}] {speaker_label}{text}")
+    return "\n\n".join(segments)
+
+
+SMOKE_VTT = """WEBVTT
+
+1
+00:00:01.000 --> 00:00:04.000
+Anna: Hallo zusammen
+
+2
+00:00:05.000 --> 00:00:09.000
+Anna: heute geht es
+um Öle
+
+3
+00:00:10.000 --> 00:00:12.000
+10 Uhr: ohne Sprecher
+
+4
+00:01:31.000 --> 00:01:35.000
+Anna: neues Fenster
+
+5
+00:01:40.000 --> 00:01:44.000
+Ben: Frage zu Öl
 
+6
+00:01:45.000 --> 00:01:46.000
+Anna: Antwort
+"""
+
+
+def _assert_vtt_merge_smoke():
+    # Streaming from file lines (newline-terminated) parses like the whole text.
+    cues = build_cue_table(iter_vtt_cues(io.StringIO(SMOKE_VTT)))
+    assert cues == parse_vtt_cues(SMOKE_VTT)
+    assert cues.names == ["Anna", "Ben"] and cues.speakers.tolist() == [0, 0, NO_SPEAKER, 0, 1, 0]
+    # The 90 s window breaks at 1:31 (>= 0:01 + 90 s) although Anna keeps
+    # talking; a cue without a speaker continues her turn; Ben and Anna's
+    # reply each start a segment.
+    assert merge_vtt_cues(cues) == (
+        "[0:01] **Anna:** Hallo zusammen heute geht es um Öle 10 Uhr: ohne Sprecher\n\n"
+        "[1:31] **Anna:** neues Fenster\n\n"
+        "[1:40] **Ben:** Frage zu Öl\n\n"
+        "[1:45] **Anna:** Antwort"
+    )
+    # With a 5 s window, 0:10 opens a segment on a cue without a speaker,
+    # which the next named cue ends.
+    assert list(vtt_segment_bounds(cues, window_seconds=5)) == [(0, 2), (2, 3), (3, 4), (4, 5), (5, 6)]
+
+
+def _assert_cue_table_merge_smoke():
+    def list_merge(cues: list[dict], window_seconds: int) -> str:
+        # The per-cue merge CueTable replaced: one pass, speaker and window checks per cue.
+        segments, texts, speaker, start = [], [], None, None
+        for cue in cues:
+            secs = cue["start_ms"] // 1000
+            if start is None:
+                speaker, start = cue["speaker"], secs
+            elif (cue["speaker"] is not None and cue["speaker"] != speaker) or secs - start >= window_seconds:
+                label = f"**{speaker}:** " if speaker else ""
+                segments.append(f"[{seconds_to_mmss(start)}] {label}{' '.join(texts)}")
+                texts, speaker, start = [], cue["speaker"], secs
+            texts.append(cue["text"])
+        if texts:
+            label = f"**{speaker}:** " if speaker else ""
+            segments.append(f"[{seconds_to_mmss(start)}] {label}{' '.join(texts)}")
+        return "\n\n".join(segments)
+
+    rng = random.Random(22)
+    for monotonic in (True, False):
+        cues, start_ms = [], 0
+        for i in range(400):
+            start_ms += rng.randrange(0, 20000) if monotonic else rng.randrange(-5000, 20000)
+            speaker = rng.choice(["Anna", "Ben", "Cem", None])
+            cues.append({"start_ms": max(start_ms, 0), "end_ms": max(start_ms, 0) + 900,
+                         "speaker": speaker, "text": f"Satz {i}."})
+        table = build_cue_table(cues)
+        assert table.monotonic == monotonic
+        for window in (1, 30, 90):
+            assert merge_vtt_cues(table, window) == list_merge(cues, window)
+    assert merge_vtt_cues(build_cue_table([])) == list_merge([], 90) == ""
+
+
+def merge_vtt_cues_by_tokens(cues: CueTable, budget: tuple[int, int, int]) -> str:
+    """Merge VTT cues into segments of a (min, target, max) token budget.
+
+    Segments prefer to end at speaker changes, then at any cue (see
+    pack_segments). Each speaker turn inside a segment is its own
+    "[MM:SS] **Speaker:** ..." line; cues without a speaker continue the
+    current turn, and a segment opening mid-turn repeats its speaker.
+    """
+    n = len(cues.starts)
+    speakers = []  # speaker of the turn each cue belongs to
+    turns = []     # cue opens a new turn
+    current = NO_SPEAKER
+    for i in range(n):
+        speaker = cues.speakers[i]
+        turns.append(i == 0 or (speaker != NO_SPEAKER and speaker != current))
+        if speaker != NO_SPEAKER:
+            current = speaker
+        speakers.append(current)
+
+    def head(i: int) -> str:
+        label = f"**{cues.names[speakers[i]]}:** " if speakers[i] != NO_SPEAKER else ""
+        return f"[{seconds_to_mmss(cues.starts[i] // 1000)}] {label}"
+
+    first_costs, next_costs, strengths = [], [], []
+    for i in range(n):
+        text_chars = cues.offsets[i + 1] - cues.offsets[i] - 1
+        head_chars = len(head(i))
+        first_costs.append(head_chars + text_chars)
+        next_costs.append(1 + (head_chars if turns[i] else 0) + text_chars)
+        strengths.append(BREAK_STRONG if turns[i] else BREAK_TIMESTAMP)
+
+    segments = []
+    for seg_start, seg_end in pack_segments(first_costs, next_costs, strengths, budget):
+        lines = []
+        turn_start = seg_start
+        for i in range(seg_start + 1, seg_end + 1):
+            if i == seg_end or turns[i]:
+                lines.append(head(turn_start) + cues.text[cues.offsets[turn_start]:cues.offsets[i] - 1])
+                turn_start = i
+        segments.append("\n".join(lines))
     return "\n\n".join(segments)
 
 
@@ -684,21 +3016,26 @@ def convert_single_vtt(vtt_path: Path, out_dir: Path):
     else:
         date_str = vtt_path.stem
 
-    text = vtt_path.read_text(encoding="utf-8")
-    cues = parse_vtt_cues(text)
+    # Cues stream from the file (through the reduction pass) straight into the columnar table
+    reduction = new_reduction()
+    with vtt_path.open(encoding="utf-8") as f:
+        cues = iter_vtt_cues(f)
+        if reduction is not None:
+            cues = reduce_vtt_cues(cues, reduction)
+        cues = build_cue_table(cues)
 
-    if not cues:
+    if not cues.starts:
         print(f"  WARNING: No cues found in {vtt_path.name}")
         return
 
-    # Collect unique speakers
-    speakers = list({c["speaker"] for c in cues if c["speaker"]})
-
-    # Calculate duration
-    duration_secs = ts_to_seconds(cues[-1]["end"])
+    speakers = cues.names
+    duration_secs = cues.ends[-1] // 1000
     duration_str = f"{duration_secs // 3600}h {(duration_secs % 3600) // 60}min"
 
-    content = merge_vtt_cues(cues, window_seconds=90)
+    if SEGMENT_TOKENS:
+        content = merge_vtt_cues_by_tokens(cues, SEGMENT_TOKENS)
+    else:
+        content = merge_vtt_cues(cues, window_seconds=90)
     filename = f"{date_str}-live-call.md"
 
     write_md(out_dir / filename, {
@@ -709,8 +3046,10 @@ def convert_single_vtt(vtt_path: Path, out_dir: Path):
         "language": "de",
     }, f"# Live Call {date_str}\n\n{content}")
 
-    print(f"    ({len(cues)} cues -> {content.count(chr(10))//2 + 1} segments, "
+    count("cues", len(cues.starts))
+    print(f"    ({len(cues.starts)} cues -> {content.count(chr(10) * 2) + 1} segments, "
           f"{len(speakers)} speakers, {duration_str})")
+    report_reduction(reduction)
 
 
 # ---------------------------------------------------------------------------
@@ -786,17 +3125,18 @@ def concern_to_display(header: str) -> str:
     return CONCERN_DISPLAY_OVERRIDES.get(header, header)
 
 
-def convert_excel_matrices():
+def convert_excel_matrices(run: dict | None = None, jobs: int = 1):
     """Convert all Excel product matrices to Markdown + JSON."""
-    print("\n\n=== STEP 4: Converting Excel Product Matrices ===")
-    # Look in data/product_lists/0326v2/
-    xlsx_files = sorted((DATA_DIR / "product_lists" / "0326v2").glob("*.xlsx"))
+    run_stages(run, ["excel"], jobs)
+
+
+def excel_units() -> tuple[list[str], list[tuple]]:
+    """Stage 4 work: one unit per workbook in XLSX_DIR (data/product_lists/0326v2/)."""
+    xlsx_files = sorted(path for path in XLSX_DIR.glob("*.xlsx") if not path.name.startswith("~$"))  # Office lock files
     if not xlsx_files:
-        print("  No .xlsx files found in data/product_lists/0326v2/")
-        return
-    print(f"  Found {len(xlsx_files)} Excel files")
-    for xlsx_path in xlsx_files:
-        convert_single_excel_matrix(xlsx_path)
+        return [f"  No .xlsx files found in {rel_key(XLSX_DIR)}/"], []
+    notes = [f"  Found {len(xlsx_files)} Excel files"]
+    return notes, [(xlsx_path, convert_single_excel_matrix, (xlsx_path,)) for xlsx_path in xlsx_files]
 
 
 INGREDIENT_FLAG_TRAILING_PAREN = re.compile(
@@ -838,24 +3178,25 @@ def parse_ingredient_flags(name: str) -> tuple[str, list[str]]:
     return name[: m.start()].rstrip(), flags
 
 
-# Module-level smoke asserts (run on import).
-assert normalize_ingredient_paren("OGX Biotin & Collagen (Silikon)") == "OGX Biotin & Collagen (Silikone)"
-assert normalize_ingredient_paren("Pomelo (Silikone)") == "Pomelo (Silikone)"  # idempotent
-assert parse_ingredient_flags("Pomelo Molecular Repair (Silikone)") == ("Pomelo Molecular Repair", ["silicones"])
-assert parse_ingredient_flags("Cantu Repair Cream (Kokos)") == ("Cantu Repair Cream", ["oils"])
-assert parse_ingredient_flags("OGX Renewing Argan Oil (Silikone /Kokos)") == ("OGX Renewing Argan Oil", ["silicones", "oils"])
-assert parse_ingredient_flags("Monday Moisture (Silikone / Kokos)") == ("Monday Moisture", ["silicones", "oils"])
-# '+' separator variant — appears in oil sheet (e.g. OGX Bond Protein Repair).
-assert parse_ingredient_flags("OGX Bond Protein Repair (Silikone + Kokos)") == ("OGX Bond Protein Repair", ["silicones", "oils"])
-assert parse_ingredient_flags("OGX (Silikone+Kokos)") == ("OGX", ["silicones", "oils"])
-# Reverse-order annotation: body lookup is order-independent (Silikone-first then Kokos),
-# so the flags list stays in canonical [silicones, oils] order regardless of input order.
-assert parse_ingredient_flags("OGX (Kokos / Silikone)") == ("OGX", ["silicones", "oils"])
-assert parse_ingredient_flags("OGX (Kokos /Silikone)") == ("OGX", ["silicones", "oils"])
-assert parse_ingredient_flags("OGX (silikone)") == ("OGX (silikone)", [])  # case-sensitive: don't strip lowercase
-assert parse_ingredient_flags("OGX") == ("OGX", [])  # no parens
-assert parse_ingredient_flags("Plain Name") == ("Plain Name", [])
-assert parse_ingredient_flags("Garnier (Drogerie)") == ("Garnier (Drogerie)", [])  # don't strip non-ingredient parens
+# Smoke asserts, run at the start of every CLI run (not on import).
+def _assert_parse_ingredient_flags_smoke():
+    assert normalize_ingredient_paren("OGX Biotin & Collagen (Silikon)") == "OGX Biotin & Collagen (Silikone)"
+    assert normalize_ingredient_paren("Pomelo (Silikone)") == "Pomelo (Silikone)"  # idempotent
+    assert parse_ingredient_flags("Pomelo Molecular Repair (Silikone)") == ("Pomelo Molecular Repair", ["silicones"])
+    assert parse_ingredient_flags("Cantu Repair Cream (Kokos)") == ("Cantu Repair Cream", ["oils"])
+    assert parse_ingredient_flags("OGX Renewing Argan Oil (Silikone /Kokos)") == ("OGX Renewing Argan Oil", ["silicones", "oils"])
+    assert parse_ingredient_flags("Monday Moisture (Silikone / Kokos)") == ("Monday Moisture", ["silicones", "oils"])
+    # '+' separator variant — appears in oil sheet (e.g. OGX Bond Protein Repair).
+    assert parse_ingredient_flags("OGX Bond Protein Repair (Silikone + Kokos)") == ("OGX Bond Protein Repair", ["silicones", "oils"])
+    assert parse_ingredient_flags("OGX (Silikone+Kokos)") == ("OGX", ["silicones", "oils"])
+    # Reverse-order annotation: body lookup is order-independent (Silikone-first then Kokos),
+    # so the flags list stays in canonical [silicones, oils] order regardless of input order.
+    assert parse_ingredient_flags("OGX (Kokos / Silikone)") == ("OGX", ["silicones", "oils"])
+    assert parse_ingredient_flags("OGX (Kokos /Silikone)") == ("OGX", ["silicones", "oils"])
+    assert parse_ingredient_flags("OGX (silikone)") == ("OGX (silikone)", [])  # case-sensitive: don't strip lowercase
+    assert parse_ingredient_flags("OGX") == ("OGX", [])  # no parens
+    assert parse_ingredient_flags("Plain Name") == ("Plain Name", [])
+    assert parse_ingredient_flags("Garnier (Drogerie)") == ("Garnier (Drogerie)", [])  # don't strip non-ingredient parens
 
 
 def parse_cell_products(cell_value) -> list[str]:
@@ -934,6 +3275,8 @@ def convert_single_excel_matrix(xlsx_path: Path):
     category = filename_stem  # fallback: filename without extension
     print(f"\n  Processing: {filename_stem}")
 
+    import openpyxl
+
     wb = openpyxl.load_workbook(str(xlsx_path))
     ws = wb.active
 
@@ -1010,6 +3353,7 @@ def convert_single_excel_matrix(xlsx_path: Path):
         for hair_data in matrix.values()
         for prods in hair_data.values()
     )
+    count("product_entries", total_products)
     print(f"    {len(matrix)} hair textures, {len(headers)} need categories, {total_products} product entries")
 
     generate_matrix_markdown(category, matrix, uses_ingredient_flags=uses_ingredient_flags)
@@ -1154,7 +3498,7 @@ def build_product_json_list(
     return list(product_map.values())
 
 
-# Module-level smoke assert: same product appearing in two cells with different
+# Smoke assert: same product appearing in two cells with different
 # trailing parens must merge both flags (order-independent parse).
 def _assert_ingredient_flags_merge_smoke():
     matrix_two_cells = {
@@ -1199,43 +3543,564 @@ def _assert_ingredient_flags_merge_smoke():
     assert products_single[0]["ingredient_flags"] == ["silicones"]
 
 
-_assert_ingredient_flags_merge_smoke()
-
-
 def generate_product_json(category: str, matrix: dict, uses_ingredient_flags: bool = False):
     """Write the product JSON file for catalog ingestion.
 
     Wraps `build_product_json_list` with the file-writing side effect.
     """
     slug = slugify(category)
-    out_dir = DATA_DIR / "products-from-excel"
-    out_dir.mkdir(parents=True, exist_ok=True)
+    out_dir = PRODUCTS_JSON_DIR
     out_path = out_dir / f"{slug}.json"
 
     product_list = build_product_json_list(category, matrix, uses_ingredient_flags=uses_ingredient_flags)
-    out_path.write_text(json.dumps(product_list, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"  -> {out_path.relative_to(BASE_DIR)} ({len(product_list)} products)")
+    if STREAM_RECORDS:
+        emit_record({"kind": "products", "path": out_path.name, "category": category, "products": product_list})
+    else:
+        write_output(out_path, json.dumps(product_list, ensure_ascii=False, indent=2).encode("utf-8"))
+        record_output(out_path)
+    count("products", len(product_list))
+    print(f"  -> {rel_key(out_path)} ({len(product_list)} products)")
+
+
+# ---------------------------------------------------------------------------
+# INSTRUMENTATION
+# ---------------------------------------------------------------------------
+
+# Counters of the source unit currently being converted (None = not measuring).
+_unit_counts: dict[str, int] | None = None
+
+
+def count(name: str, n: int = 1):
+    """Add n to a per-unit counter (documents, cues, questions, products, ...)."""
+    if _unit_counts is not None:
+        _unit_counts[name] = _unit_counts.get(name, 0) + n
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (not of one unit), in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere.
+    return round(peak / 2**20 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def execute_unit(stage: str, source_path: Path, convert, args: tuple) -> tuple[list[Path], dict]:
+    """Run one unit, returning its outputs and metrics.
+
+    Metrics: wall/CPU seconds, the process's peak RSS after the unit and how
+    much the unit raised it, output bytes and counters; tracemalloc peak with
+    TRACE_MEMORY; a cProfile dump under PROFILE_DIR.
+    """
+    global _unit_counts
+    previous_counts = _unit_counts
+    _unit_counts = {}
+    profiler = cProfile.Profile() if PROFILE_DIR is not None else None
+    if TRACE_MEMORY:
+        tracemalloc.start()
+    rss_before = peak_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            outputs = collect_outputs(convert, *args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+        metrics = {
+            "wall_s": round(time.perf_counter() - wall_start, 4),
+            "cpu_s": round(time.process_time() - cpu_start, 4),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        metrics["rss_growth_mb"] = round(metrics["peak_rss_mb"] - rss_before, 1)
+        if TRACE_MEMORY:
+            metrics["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        metrics["output_bytes"] = sum(staged_path(out).stat().st_size for out in outputs)
+        metrics["counts"] = dict(sorted(_unit_counts.items()))
+    finally:
+        if TRACE_MEMORY:
+            tracemalloc.stop()
+        _unit_counts = previous_counts
+    if profiler is not None:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        profile_path = PROFILE_DIR / f"{stage}--{slugify(source_path.name)}.prof"
+        profiler.dump_stats(str(profile_path))
+        metrics["profile"] = str(profile_path)
+    return outputs, metrics
+
+
+def summarize_stage(name: str, units: list[dict], wall_s: float) -> dict:
+    """Aggregate per-unit metrics into a stage entry of the run report.
+
+    wall_s is the stage's elapsed time; unit_s and cpu_s sum the units' wall
+    and CPU time (with --jobs they overlap, so unit_s can exceed wall_s).
+    """
+    converted = [unit for unit in units if not unit["skipped"]]
+    counts: dict[str, int] = {}
+    for unit in converted:
+        for key, n in unit["counts"].items():
+            counts[key] = counts.get(key, 0) + n
+    stage = {
+        "units": len(units),
+        "converted": len(converted),
+        "wall_s": round(wall_s, 4),
+        "unit_s": round(sum(unit["wall_s"] for unit in converted), 4),
+        "cpu_s": round(sum(unit["cpu_s"] for unit in converted), 4),
+        "peak_rss_mb": max((unit["peak_rss_mb"] for unit in converted), default=0.0),
+        "rss_growth_mb": max((unit["rss_growth_mb"] for unit in converted), default=0.0),
+        "input_bytes": sum(unit["input_bytes"] for unit in units),
+        "output_bytes": sum(unit["output_bytes"] for unit in converted),
+        "counts": dict(sorted(counts.items())),
+    }
+    if TRACE_MEMORY:
+        stage["peak_traced_mb"] = max((unit["peak_traced_mb"] for unit in converted), default=0.0)
+    profiles = [unit["profile"] for unit in converted if "profile" in unit]
+    if profiles:
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stage_profile = PROFILE_DIR / f"{name}.prof"
+        stats.dump_stats(str(stage_profile))
+        stage["profile"] = str(stage_profile)
+    stage["sources"] = units
+    return stage
+
+
+def write_run_report(path: Path, stages: dict, manifest_summary: dict, chunk_plan: dict,
+                     started_at: datetime, wall_s: float, jobs: int):
+    """Write the machine-readable JSON report for this run."""
+    totals: dict = {"input_bytes": 0, "output_bytes": 0, "cpu_s": 0.0, "counts": {}}
+    for stage in stages.values():
+        totals["input_bytes"] += stage["input_bytes"]
+        totals["output_bytes"] += stage["output_bytes"]
+        totals["cpu_s"] = round(totals["cpu_s"] + stage["cpu_s"], 4)
+        for key, n in stage["counts"].items():
+            totals["counts"][key] = totals["counts"].get(key, 0) + n
+    totals["counts"] = dict(sorted(totals["counts"].items()))
+    report = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "wall_s": round(wall_s, 4),
+        "jobs": jobs,
+        "peak_rss_mb": peak_rss_mb(),
+        "totals": totals,
+        "manifest": {key: len(paths) for key, paths in manifest_summary.items()},
+        "chunk_plan": chunk_plan,
+        "stages": stages,
+    }
+    write_output(path, json.dumps(report, ensure_ascii=False, indent=2).encode("utf-8"))
+
+
+# ---------------------------------------------------------------------------
+# STAGE EXECUTION
+# ---------------------------------------------------------------------------
+
+# Stage name -> (console header, unit discovery). Each unit is
+# (source_path, converter, args); converters are module-level functions so
+# they can be shipped to pool workers.
+STAGES = {
+    "docx": ("\n=== STEP 1: Converting DOCX ===", docx_units),
+    "pdf": ("\n\n=== STEP 2: Converting Book PDF ===", pdf_units),
+    "vtt": ("\n\n=== STEP 3: Converting VTT files ===", vtt_units),
+    "excel": ("\n\n=== STEP 4: Converting Excel Product Matrices ===", excel_units),
+}
+
+
+def run_unit(stage: str, source_path: Path, convert, args: tuple) -> tuple[str, str, list[Path], dict]:
+    """Pool entry point: run one unit.
+
+    Returns its console output, its NDJSON records (with STREAM_RECORDS), its
+    outputs and its metrics.
+    """
+    global RECORD_STREAM
+    buffer = io.StringIO()
+    RECORD_STREAM = io.StringIO() if STREAM_RECORDS else None
+    try:
+        with contextlib.redirect_stdout(buffer):
+            outputs, metrics = execute_unit(stage, source_path, convert, args)
+        records = RECORD_STREAM.getvalue() if STREAM_RECORDS else ""
+    finally:
+        RECORD_STREAM = None
+    return buffer.getvalue(), records, outputs, metrics
+
+
+def run_stages(run: dict | None, stage_names: list[str], jobs: int = 1) -> dict:
+    """Convert every unit of the given stages, skipping unchanged sources.
+
+    With jobs > 1 all changed units of all stages are submitted to a process
+    pool up front; their console output (and NDJSON records) is captured and
+    replayed in stage and file order, so the log is identical to a serial run.
+
+    Returns the per-stage instrumentation (see summarize_stage).
+    """
+    plan = []
+    for name in stage_names:
+        header, discover = STAGES[name]
+        notes, units = discover()
+        plan.append((name, header, notes, [(unit, check_unit(run, name, unit[0])) for unit in units]))
+
+    pool = None
+    if jobs > 1:
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=apply_config, initargs=(current_config(),))
+    stages = {}
+    owners = {}  # output -> source unit that wrote it this run
+    try:
+        futures = {}
+        if pool is not None:
+            for name, _, _, units in plan:
+                for (source_path, convert, args), pending in units:
+                    if pending is not None:
+                        futures[source_path] = pool.submit(run_unit, name, source_path, convert, args)
+
+        for name, header, notes, units in plan:
+            stage_start = time.perf_counter()
+            print(header)
+            for note in notes:
+                print(note)
+            unit_reports = []
+            for (source_path, convert, args), pending in units:
+                unit_report = {"source": rel_key(source_path), "input_bytes": source_path.stat().st_size}
+                unit_reports.append(unit_report)
+                if pending is None:
+                    unit_report["skipped"] = True
+                    print(f"  Unchanged: {rel_key(source_path)}")
+                    continue
+                if pool is not None:
+                    log, records, outputs, metrics = futures[source_path].result()
+                    print(log, end="")
+                    if records:
+                        RECORD_STREAM.write(records)
+                        RECORD_STREAM.flush()
+                else:
+                    outputs, metrics = execute_unit(name, source_path, convert, args)
+                unit_report.update(skipped=False, **metrics)
+                for out in outputs:
+                    owner = owners.setdefault(out, source_path)
+                    if owner != source_path:
+                        print(f"  WARNING: {rel_key(out)} written by both {rel_key(owner)} and {rel_key(source_path)}")
+                record_unit(run, pending, outputs)
+            stages[name] = summarize_stage(name, unit_reports, time.perf_counter() - stage_start)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return stages
+
+
+# ---------------------------------------------------------------------------
+# WATCH MODE (--watch)
+# ---------------------------------------------------------------------------
+#
+# Polls the sources every stage would convert (stdlib only, works on any
+# filesystem incl. network shares). A change is acted on once no watched file
+# has changed for one whole interval, so half-copied recordings and workbooks
+# that are still being saved are not converted; then only the stages of the
+# changed sources run, and the manifest / section memo narrow that to the
+# changed units (a VTT file, a workbook, the edited DOCX sections).
+
+WATCH_INTERVAL = 2.0
+
+
+def source_snapshot(stage_names: list[str]) -> dict[Path, tuple]:
+    """Source path -> (stage, mtime_ns, size) for every unit of the given stages."""
+    snapshot = {}
+    for name in stage_names:
+        try:
+            _, units = STAGES[name][1]()
+        except (OSError, ValueError, SystemExit):
+            continue  # source missing (or ambiguous) right now; picked up once it lands
+        for source_path, _, _ in units:
+            try:
+                stat = source_path.stat()
+            except OSError:
+                continue
+            snapshot[source_path] = (name, stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def watch_sources(stage_names: list[str], interval: float, on_change):
+    """Call on_change(stages, sources) whenever watched sources changed and settled.
+
+    stages are the affected stage names (in pipeline order), sources the
+    added, modified or deleted source paths. Runs until interrupted.
+    """
+    seen = source_snapshot(stage_names)
+    previous = seen
+    while True:
+        time.sleep(interval)
+        current = source_snapshot(stage_names)
+        changed = sorted(path for path in current.keys() | seen.keys() if current.get(path) != seen.get(path))
+        settled = current == previous
+        previous = current
+        if not changed or not settled:
+            continue
+        affected = {(current.get(path) or seen[path])[0] for path in changed}
+        on_change([name for name in stage_names if name in affected], changed)
+        seen = current
 
 
 # ---------------------------------------------------------------------------
 # MAIN
 # ---------------------------------------------------------------------------
 
-if __name__ == "__main__":
+def token_budget(value: str) -> tuple[int, int, int]:
+    """Parse --segment-tokens: TARGET or MIN:TARGET:MAX."""
+    try:
+        numbers = [int(part) for part in value.split(":")]
+    except ValueError:
+        numbers = []
+    if len(numbers) == 1:
+        numbers = [numbers[0] // 2, numbers[0], numbers[0] * 3 // 2]
+    if len(numbers) != 3 or not 0 < numbers[0] <= numbers[1] <= numbers[2]:
+        raise argparse.ArgumentTypeError(f"expected TARGET or MIN:TARGET:MAX with 0 < MIN <= TARGET <= MAX, got {value!r}")
+    return tuple(numbers)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line options."""
+    parser = argparse.ArgumentParser(description="Convert raw knowledge sources into Markdown.")
+    parser.add_argument(
+        "--only", action="append", choices=list(STAGES), metavar="STAGE",
+        help="Run only this stage (docx, pdf, vtt, excel); repeatable. Default: all stages",
+    )
+    parser.add_argument(
+        "--corpus", action="append", type=Path, metavar="DIR",
+        help="Convert every DOCX/PDF under DIR (repeatable) into data/markdown/corpus/<document>/ "
+             "instead of the single --docx/--pdf",
+    )
+    parser.add_argument("--docx", type=Path, help="Source DOCX (default: discovered in project root/data)")
+    parser.add_argument("--pdf", type=Path, help="Source book PDF (default: discovered in data)")
+    parser.add_argument("--vtt-dir", type=Path, help="Directory with *.vtt files (default: data)")
+    parser.add_argument("--xlsx-dir", type=Path, help="Directory with product matrices (default: data/product_lists/0326v2)")
+    parser.add_argument("--out-dir", type=Path, help="Markdown output root (default: data/markdown)")
+    parser.add_argument("--json-dir", type=Path, help="Product JSON output dir (default: data/products-from-excel)")
+    parser.add_argument("--force", action="store_true", help="Reconvert sources even if unchanged")
+    parser.add_argument("--report", type=Path, help=f"JSON run report path (default: <out-dir>/{REPORT_NAME})")
+    parser.add_argument("--profile-dir", type=Path, help="Write cProfile dumps per unit and per stage here")
+    parser.add_argument("--trace-memory", action="store_true", help="Record tracemalloc peak per unit (slower)")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Convert sources in N worker processes (default: 1, serial)",
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path,
+        help="Extraction cache for DOCX paragraphs and pdftotext output (default: data/.extract-cache)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Always re-extract DOCX/PDF sources")
+    parser.add_argument(
+        "--pdf-extract", choices=["whole", "pages"], default="whole",
+        help="Book extraction: one cached pdftotext run (default) or concurrent page-range runs per chapter",
+    )
+    parser.add_argument(
+        "--pdf-timeout", type=float, default=PDF_TIMEOUT, metavar="SECONDS",
+        help=f"Timeout per pdftotext call with --pdf-extract pages (default: {PDF_TIMEOUT})",
+    )
+    parser.add_argument(
+        "--segment-tokens", type=token_budget, metavar="[MIN:]TARGET[:MAX]",
+        help="Segment transcripts and live calls to a token budget, one segment per embedding chunk "
+             "(default bounds: TARGET/2 and 3*TARGET/2)",
+    )
+    parser.add_argument(
+        "--reduce-transcripts", action="store_true",
+        help="Drop fillers, repeated words and backchannel cues from transcripts and live calls",
+    )
+    parser.add_argument(
+        "--docx-reader", choices=list(DOCX_READERS), default="stream",
+        help="DOCX paragraph reader: incremental XML stream (default) or the python-docx object model",
+    )
+    parser.add_argument(
+        "--format", choices=["files", "ndjson"], default="files",
+        help="files: write Markdown/JSON outputs (default); ndjson: stream document records instead",
+    )
+    parser.add_argument(
+        "--out", default="-", metavar="PATH",
+        help="With --format ndjson: record destination, '-' for stdout (default)",
+    )
+    parser.add_argument(
+        "--dup-threshold", type=float, default=0.8, metavar="J",
+        help=f"Report segments with estimated Jaccard similarity >= J in {NEAR_DUPLICATES_NAME} "
+             "(default: 0.8; 0 disables)",
+    )
+    parser.add_argument(
+        "--fts", nargs="?", const=True, type=Path, metavar="PATH",
+        help=f"Build a SQLite FTS5 index of all documents and segments (default path: <out-dir>/{FTS_INDEX_NAME})",
+    )
+    parser.add_argument(
+        "--search", metavar="QUERY",
+        help="Query the FTS5 index (--fts PATH or the default) and exit (no conversion)",
+    )
+    parser.add_argument(
+        "--watch", nargs="?", const=WATCH_INTERVAL, type=float, metavar="SECONDS",
+        help=f"After the run, poll the sources and convert changes as they land (default interval: {WATCH_INTERVAL:g}s)",
+    )
+    parser.add_argument(
+        "--events", metavar="PATH",
+        help="With --watch: append one JSON change event per conversion to PATH ('-' for stdout, log on stderr)",
+    )
+    parser.add_argument(
+        "--diff-segments", nargs=2, type=Path, metavar=("OLD", "NEW"),
+        help=f"Compare two {SEGMENTS_NAME} snapshots and exit (no conversion)",
+    )
+    args = parser.parse_args(argv)
+    if args.watch is not None and args.format == "ndjson":
+        parser.error("--watch writes files; it cannot be combined with --format ndjson")
+    if args.events and args.watch is None:
+        parser.error("--events requires --watch")
+    return args
+
+
+def main(argv: list[str] | None = None):
+    args = parse_args(argv)
+    if args.diff_segments:
+        old, new = (load_records(path) for path in args.diff_segments)
+        print_segment_diff(diff_segment_records(old, new))
+        return
+    overrides = {
+        "DOCX_PATH": args.docx,
+        "PDF_PATH": args.pdf,
+        "VTT_DIR": args.vtt_dir,
+        "XLSX_DIR": args.xlsx_dir,
+        "MD_DIR": args.out_dir,
+        "PRODUCTS_JSON_DIR": args.json_dir,
+        "PROFILE_DIR": args.profile_dir,
+        "EXTRACT_CACHE_DIR": args.cache_dir,
+    }
+    apply_config({name: path.resolve() for name, path in overrides.items() if path is not None})
+    apply_config({"TRACE_MEMORY": args.trace_memory})
+    fts_path = None
+    if args.fts is not None or args.search:
+        # Bare --fts (const True) means the default; an explicit PATH is used as given.
+        fts_path = args.fts.resolve() if isinstance(args.fts, Path) else MD_DIR / FTS_INDEX_NAME
+    if args.search:
+        for path, anchor, score, snippet in search_fts_index(fts_path, args.search):
+            print(f"{score:>8} {path} {anchor}: {' '.join(snippet.split())}")
+        return
+    if args.corpus:
+        apply_config({"CORPUS_ROOTS": [root.resolve() for root in args.corpus]})
+    if args.no_cache:
+        apply_config({"EXTRACT_CACHE_DIR": None})
+    apply_config({"DOCX_READER": args.docx_reader, "REUSE_SECTIONS": not args.force})
+    apply_config({"PDF_EXTRACT": args.pdf_extract, "PDF_TIMEOUT": args.pdf_timeout})
+    apply_config({"SEGMENT_TOKENS": args.segment_tokens, "REDUCE_TRANSCRIPTS": args.reduce_transcripts})
+    jobs = max(1, args.jobs)
+    stage_names = [name for name in STAGES if not args.only or name in args.only]
+
+    _assert_parse_ingredient_flags_smoke()
+    _assert_ingredient_flags_merge_smoke()
+    _assert_transcript_reduction_smoke()
+    _assert_qa_segment_diff_smoke()
+    _assert_pdf_paragraphs_smoke()
+    _assert_vtt_merge_smoke()
+    _assert_cue_table_merge_smoke()
+    _assert_pack_segments_smoke()
+
+    if args.format == "ndjson":
+        stream = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+        try:
+            with contextlib.redirect_stdout(sys.stderr):
+                print("=" * 60)
+                print("Knowledge Source Conversion Pipeline (NDJSON stream)")
+                print("=" * 60)
+                stages = stream_records(stage_names, jobs, stream)
+                documents = sum(stage["counts"].get("documents", 0) for stage in stages.values())
+                products = sum(stage["counts"].get("products", 0) for stage in stages.values())
+                print(f"\n{'=' * 60}")
+                print(f"DONE! Streamed {documents} documents and {products} products")
+                print(f"{'=' * 60}")
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+        return
+
+    if args.watch is None:
+        run_pipeline(args, stage_names, jobs, fts_path, force=args.force)
+        return
+
+    events = None
+    if args.events:
+        events = sys.stdout if args.events == "-" else open(args.events, "a", encoding="utf-8")
+    try:
+        with contextlib.redirect_stdout(sys.stderr) if events is sys.stdout else contextlib.nullcontext():
+            run_pipeline(args, stage_names, jobs, fts_path, force=args.force)
+            print(f"\nWatching {', '.join(stage_names)} sources every {args.watch:g}s (Ctrl-C to stop)")
+
+            def on_change(stages: list[str], sources: list[Path]):
+                print(f"\n[{datetime.now():%H:%M:%S}] Changed: {', '.join(rel_key(path) for path in sources)}")
+                try:
+                    summary = run_pipeline(args, stages, jobs, fts_path, force=False)
+                except Exception as exc:  # keep watching; the next change retries
+                    print(f"  ERROR: conversion failed: {exc!r}")
+                    return
+                if events is not None:
+                    events.write(json.dumps({
+                        "kind": "change",
+                        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                        "stages": stages,
+                        "sources": [rel_key(path) for path in sources],
+                        "dirty": summary["dirty"],
+                        "removed": summary["removed"],
+                    }, ensure_ascii=False) + "\n")
+                    events.flush()
+
+            watch_sources(stage_names, args.watch, on_change)
+    except KeyboardInterrupt:
+        print("\nStopped watching.", file=sys.stderr)
+    finally:
+        if events is not None and events is not sys.stdout:
+            events.close()
+
+
+def run_pipeline(args: argparse.Namespace, stage_names: list[str], jobs: int,
+                 fts_path: Path | None, force: bool) -> dict:
+    """Convert the given stages into files and refresh the derived indexes.
+
+    Returns the manifest summary (see finish_manifest_run).
+    """
     print("=" * 60)
     print("Knowledge Source Conversion Pipeline")
     print("=" * 60)
 
-    parse_docx()
-    parse_pdf()
-    parse_vtt_files()
-    convert_excel_matrices()
-
-    # Summary
-    md_files = list(MD_DIR.rglob("*.md"))
+    started_at = datetime.now(timezone.utc)
+    wall_start = time.perf_counter()
+    run = start_manifest_run(stage_names, force=force)
+    begin_staging()
+    stages = run_stages(run, stage_names, jobs=jobs)
+    manifest_summary = finish_manifest_run(run)
+    write_document_index(manifest_summary["outputs"])
+    chunk_plan = write_chunk_plan(manifest_summary["outputs"])
+    segments, segment_diff = write_segment_fingerprints(manifest_summary["outputs"])
+    write_output(MD_DIR / SEGMENT_DIFF_NAME, json.dumps(segment_diff, ensure_ascii=False, indent=2).encode("utf-8"))
+    print_segment_diff(segment_diff)
+    if args.dup_threshold > 0:
+        near_duplicates = write_near_duplicates(
+            segments, args.dup_threshold, changed=bool(manifest_summary["dirty"] or manifest_summary["removed"]))
+        print(f"\n  Near-duplicates (>= {args.dup_threshold:.0%}): {near_duplicates['duplicate_segments']} segments "
+              f"in {near_duplicates['clusters']} clusters, ~{estimate_tokens(near_duplicates['duplicate_chars']):,} "
+              f"tokens ({rel_key(MD_DIR / NEAR_DUPLICATES_NAME)})")
+    else:
+        remove_output(MD_DIR / NEAR_DUPLICATES_NAME)
+    if update_fts_index(run, fts_path if args.fts is not None else None, segments):
+        print(f"\n  Full-text index: {len(segments)} documents -> {rel_key(fts_path)}")
+    elif args.fts is not None:
+        print(f"\n  Full-text index: unchanged ({rel_key(fts_path)})")
+    print("\n  Chunk plan (estimated):")
+    for source_type, total in chunk_plan.items():
+        print(f"    {source_type:<14} {total['documents']:>5} docs {total['chunks']:>6} chunks "
+              f"{total['tokens']:>9,} tokens")
+    report_path = (args.report or MD_DIR / REPORT_NAME).resolve()
+    write_run_report(report_path, stages, manifest_summary, chunk_plan, started_at,
+                     time.perf_counter() - wall_start, jobs)
+    publish_staging()
+
+    # Summary: outputs tracked by the manifest, not whatever else sits in MD_DIR
+    md_files = [BASE_DIR / out for out in manifest_summary["outputs"] if out.endswith(".md")]
     total_chars = sum(f.stat().st_size for f in md_files)
+    converted = sum(stage["counts"].get("documents", 0) for stage in stages.values())
     print(f"\n{'=' * 60}")
-    print(f"DONE! Created {len(md_files)} Markdown files")
+    print(f"DONE! {len(md_files)} Markdown files ({converted} converted this run)")
     print(f"Total output size: {total_chars:,} bytes ({total_chars // 1024:,} KB)")
-    print(f"Output directory: {MD_DIR.relative_to(BASE_DIR)}")
+    print(f"Output directory: {rel_key(MD_DIR)}")
+    print(f"Run report: {rel_key(report_path)}")
     print(f"{'=' * 60}")
+    return manifest_summary
+
+
+if __name__ == "__main__":
+    main()
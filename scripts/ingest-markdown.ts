@@ -435,12 +435,28 @@ function chunkNatural(text: string, maxSize: number): string[] {
   return chunks
 }
 
+/**
+ * Segment chunking: every paragraph becomes one chunk, lone "# " headers skipped.
+ * Used for documents written with `segmentation: "tokens"` (convert_sources.py
+ * --segment-tokens), whose paragraphs are already sized to the token budget.
+ */
+function chunkSegments(text: string): string[] {
+  return text
+    .split(/\n\n+/)
+    .map((para) => para.trim())
+    .filter((para) => para && !(para.startsWith("# ") && para.length < 80))
+}
+
 /**
  * Apply content-type-specific chunking strategy.
  */
 function chunkContent(text: string, sourceType: string, frontMatter?: FrontMatter): string[] {
   const config = CHUNK_CONFIG[sourceType] || CHUNK_CONFIG["transcript"]
 
+  if (frontMatter?.segmentation === "tokens") {
+    return chunkSegments(text)
+  }
+
   switch (config.strategy) {
     case "qa":
       return chunkQA(text)